@@ -0,0 +1,99 @@
+# **************************************************************************************************************
+# content       = bulk extraction of the scene's animCurves into flat numpy arrays
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import numpy as np
+import maya.cmds as cmds
+
+# **************************************************************************************************************
+
+# Time based curves only, driven keys (animCurveU*) are left out
+TIME_CURVE_TYPES = ['animCurveTL', 'animCurveTA', 'animCurveTU', 'animCurveTT']
+
+
+def list_curves():
+    """
+    Returns:
+        list: Names of all the time based animCurves in the scene
+    """
+    return cmds.ls(type=TIME_CURVE_TYPES) or []
+
+
+def extract_curves(curves, tangents=True, counts=None):
+    """
+    Reading all the keys of 'curves' with one query per key property for all the curves,
+    the per curve key count is the only per curve query.
+
+    Args:
+        curves (list): animCurve names
+        tangents (bool): Also read the in/out tangent types and angles
+        counts (list): Key count per curve when already queried, from curve_key_counts()
+
+    Returns:
+        dict: 'offsets' (curves + 1) start index of each curve in the flat arrays,
+              'times', 'values' (keys) and, with tangents, 'in_types', 'out_types', 'in_angles', 'out_angles' (keys)
+    """
+    # Without curves, the queries below would fall back on the selection
+    if not curves:
+        curve_data = {'offsets': np.zeros(1, dtype=np.int64),
+                      'times': np.zeros(0, dtype=np.float64),
+                      'values': np.zeros(0, dtype=np.float64)}
+        if tangents:
+            curve_data.update({'in_types': np.zeros(0, dtype=str), 'out_types': np.zeros(0, dtype=str),
+                               'in_angles': np.zeros(0, dtype=np.float64), 'out_angles': np.zeros(0, dtype=np.float64)})
+        return curve_data
+
+    if counts is None:
+        counts = curve_key_counts(curves)
+    offsets = np.zeros(len(curves) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(counts)
+
+    curve_data = {'offsets': offsets,
+                  'times': np.array(cmds.keyframe(curves, query=True, timeChange=True) or [], dtype=np.float64),
+                  'values': np.array(cmds.keyframe(curves, query=True, valueChange=True) or [], dtype=np.float64)}
+
+    if tangents:
+        curve_data['in_types'] = np.array(cmds.keyTangent(curves, query=True, inTangentType=True) or [])
+        curve_data['out_types'] = np.array(cmds.keyTangent(curves, query=True, outTangentType=True) or [])
+        curve_data['in_angles'] = np.array(cmds.keyTangent(curves, query=True, inAngle=True) or [], dtype=np.float64)
+        curve_data['out_angles'] = np.array(cmds.keyTangent(curves, query=True, outAngle=True) or [], dtype=np.float64)
+
+    return curve_data
+
+
+def curve_key_counts(curves):
+    """
+    Returns:
+        list: Key count of each curve, one query per curve
+    """
+    return [cmds.keyframe(curve, query=True, keyframeCount=True) for curve in curves]
+
+
+def curve_ids(offsets):
+    """
+    Returns:
+        np.ndarray: Curve index of every key of the flat arrays
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def index_ranges(key_indices):
+    """
+    Grouping sorted key indices into (first, last) ranges for 'cutKey'
+
+    Args:
+        key_indices (np.ndarray): Sorted key indices of one curve
+
+    Returns:
+        list: (first, last) index tuples
+    """
+    if not len(key_indices):
+        return []
+    breaks = np.nonzero(np.diff(key_indices) != 1)[0]
+    firsts = np.concatenate([[key_indices[0]], key_indices[breaks + 1]])
+    lasts = np.concatenate([key_indices[breaks], [key_indices[-1]]])
+    return [(int(first), int(last)) for first, last in zip(firsts, lasts)]
@@ -0,0 +1,268 @@
+# **************************************************************************************************************
+# content       = 'Keyframe Analysis' (sub-frame keys, spacing) and 'In-Betweens' (gaps between keys) checks
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import numpy as np
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+from checks.animation import anim_curves
+
+# **************************************************************************************************************
+
+# Keys read per pass (a longer curve is read alone), memory stays bounded whatever the shot length or curve count
+KEY_BUDGET = 500000
+
+OFF_FRAME_TOLERANCE = 1e-3
+MAX_GAP = 24
+SPACING_BINS = np.array([0, 1, 2, 3, 4, 6, 8, 12, 16, 24, np.inf])
+
+NO_CHARACTER = '(no namespace)'
+
+
+def curve_controls(curves):
+    """
+    Returns the node each curve drives, with one 'listConnections' for all the curves
+
+    Args:
+        curves (list): animCurve names
+
+    Returns:
+        list: Driven node per curve, the curve itself when it isn't connected
+    """
+    connections = cmds.listConnections([curve + '.output' for curve in curves], source=False, destination=True,
+                                       connections=True, skipConversionNodes=True) or []
+    driven = {}
+    for index in range(0, len(connections), 2):
+        driven.setdefault(connections[index].split('.', 1)[0], connections[index + 1])
+    return [driven.get(curve, curve) for curve in curves]
+
+
+def chunk_stats(curve_data):
+    """
+    Vectorized per curve stats of one chunk
+
+    Args:
+        curve_data (dict): From anim_curves.extract_curves()
+
+    Returns:
+        dict: 'keys', 'off_frame', 'collisions', 'gaps' and 'max_gap' arrays (one value per curve),
+              'spacing' (curves, bins) spacing histogram of each curve
+    """
+    times = curve_data['times']
+    offsets = curve_data['offsets']
+    curve_count = len(offsets) - 1
+    key_curves = anim_curves.curve_ids(offsets)
+
+    off_frame = np.abs(times - np.round(times)) > OFF_FRAME_TOLERANCE
+
+    # Sub-frame keys snapping on the frame of a neighbour key of the same curve
+    rounded = np.round(times)
+    colliding = (rounded[1:] == rounded[:-1]) & (key_curves[1:] == key_curves[:-1]) & (off_frame[1:] | off_frame[:-1])
+
+    # Spacing between consecutive keys of the same curve
+    spacing = np.diff(times)
+    same_curve = key_curves[1:] == key_curves[:-1]
+    spacing, spacing_curves = spacing[same_curve], key_curves[1:][same_curve]
+
+    max_gap = np.zeros(curve_count)
+    np.maximum.at(max_gap, spacing_curves, spacing)
+
+    # One bincount over (curve, bin) pairs gives every curve's histogram
+    bin_count = len(SPACING_BINS) - 1
+    spacing_bins = np.clip(np.digitize(spacing, SPACING_BINS) - 1, 0, bin_count - 1)
+    histograms = np.bincount(spacing_curves * bin_count + spacing_bins,
+                             minlength=curve_count * bin_count).reshape(curve_count, bin_count)
+
+    return {'keys': np.diff(offsets),
+            'off_frame': np.bincount(key_curves[off_frame], minlength=curve_count),
+            'collisions': np.bincount(key_curves[1:][colliding], minlength=curve_count),
+            'gaps': np.bincount(spacing_curves[spacing > MAX_GAP], minlength=curve_count),
+            'max_gap': max_gap,
+            'spacing': histograms}
+
+
+def character_name(control):
+    """
+    Returns the control's character (namespace), NO_CHARACTER without namespace
+    """
+    return control.rsplit(':', 1)[0] if ':' in control else NO_CHARACTER
+
+
+def key_chunks(curves):
+    """
+    Yields consecutive curves holding up to KEY_BUDGET keys together, from one key count query per curve
+
+    Yields:
+        list: animCurve names
+        list: Their key counts
+    """
+    counts = anim_curves.curve_key_counts(curves)
+    start, total = 0, 0
+    for index, count in enumerate(counts):
+        if total and total + count > KEY_BUDGET:
+            yield curves[start:index], counts[start:index]
+            start, total = index, 0
+        total += count
+    if start < len(curves):
+        yield curves[start:], counts[start:]
+
+
+def stream_stats(curves):
+    """
+    Streaming over the curves KEY_BUDGET keys at a time and aggregating per control and per character
+
+    Args:
+        curves (list): animCurve names
+
+    Returns:
+        dict: Control name as key, dict of keys, off_frame, collisions, gaps, max_gap, off_frame_curves
+              and collision_curves as value
+        dict: Character (namespace) as key, dict of keys, off_frame, gaps and spacing histogram as value
+    """
+    controls = {}
+    characters = {}
+
+    for chunk, counts in key_chunks(curves):
+        stats = chunk_stats(anim_curves.extract_curves(chunk, tangents=False, counts=counts))
+
+        for index, control in enumerate(curve_controls(chunk)):
+            control_stats = controls.setdefault(control, {'keys': 0, 'off_frame': 0, 'collisions': 0, 'gaps': 0,
+                                                          'max_gap': 0.0, 'off_frame_curves': [], 'collision_curves': []})
+            control_stats['keys'] += int(stats['keys'][index])
+            control_stats['off_frame'] += int(stats['off_frame'][index])
+            control_stats['collisions'] += int(stats['collisions'][index])
+            control_stats['gaps'] += int(stats['gaps'][index])
+            control_stats['max_gap'] = max(control_stats['max_gap'], float(stats['max_gap'][index]))
+            if stats['collisions'][index]:
+                control_stats['collision_curves'].append(chunk[index])
+            elif stats['off_frame'][index]:
+                control_stats['off_frame_curves'].append(chunk[index])
+
+            character_stats = characters.setdefault(character_name(control), {'keys': 0, 'off_frame': 0, 'gaps': 0,
+                                                                              'spacing': np.zeros(len(SPACING_BINS) - 1, dtype=np.int64)})
+            character_stats['keys'] += int(stats['keys'][index])
+            character_stats['off_frame'] += int(stats['off_frame'][index])
+            character_stats['gaps'] += int(stats['gaps'][index])
+            character_stats['spacing'] += stats['spacing'][index]
+
+    return controls, characters
+
+
+def spacing_text(histogram):
+    """
+    Returns:
+        str: The non empty bins of a spacing histogram i.e.: '1-2f: 40, 24+f: 2'
+    """
+    labels = [f'{int(low)}-{int(high)}' if np.isfinite(high) else f'{int(low)}+'
+              for low, high in zip(SPACING_BINS[:-1], SPACING_BINS[1:])]
+    return ', '.join(f'{label}f: {count}' for label, count in zip(labels, histogram) if count)
+
+
+def add_character_lines(report, characters):
+    """
+    Adding one summary entry per character of the reported controls, keyed by the character
+
+    Args:
+        report (dict): Control name as key, list of html line lists as value
+        characters (dict): From stream_stats()
+    """
+    for character in sorted(set(character_name(control) for control in report)):
+        stats = characters[character]
+        report[character] = [['Character ' + str(character) + ': ' + str(stats['keys']) + ' keys, '
+                              + str(stats['off_frame']) + ' sub-frame keys, ' + str(stats['gaps']) + ' gaps above '
+                              + str(MAX_GAP) + ' frames. Spacing: ' + spacing_text(stats['spacing'])]]
+
+
+@qc_profiler.profile
+def keyframe_analysis(button_clicked):
+    """
+    Main function called from the UI to check for sub-frame keys and report the key spacing
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of control names and their sub-frame keys when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    analysis_report = {}
+
+    controls, characters = stream_stats(anim_curves.list_curves())
+    off_frame_controls = {control: stats for control, stats in controls.items() if stats['off_frame']}
+
+    # Running the check
+    if button_clicked == 'run_button':
+        if off_frame_controls:
+            status_flag = 'failed'
+
+            # Filling the list report
+            for control, stats in sorted(off_frame_controls.items()):
+                report_list = ["<b style='color:rgb(255,0,0);'>Keyframe Analysis failed:</b> " + 'Control ' + str(control) + ' has ' + str(stats['off_frame']) + ' sub-frame keys']
+                if stats['collisions']:
+                    report_list.append("<b style='color:rgb(255,0,0);'>Keyframe Analysis failed:</b> " + 'Control ' + str(control) + ' has ' + str(stats['collisions']) + ' sub-frame keys snapping on an already keyed frame, snap them manually')
+                analysis_report[control] = [report_list]
+            add_character_lines(analysis_report, characters)
+
+    # Running the fix: snapping the sub-frame keys on whole frames, one call for all the curves.
+    # Snapping would merge the keys landing on an already keyed frame: those curves are left to the animator
+    elif button_clicked == 'fix_button':
+        off_frame_curves = [curve for stats in off_frame_controls.values() for curve in stats['off_frame_curves']]
+        if off_frame_curves:
+            cmds.snapKey(off_frame_curves, timeMultiple=1)
+
+        for control, stats in sorted(off_frame_controls.items()):
+            if stats['collisions']:
+                status_flag = 'failed'
+                button_switch = 1
+                analysis_report[control] = [["<b style='color:rgb(255,0,0);'>Keyframe Analysis skipped:</b> " + 'Control ' + str(control) + ' has ' + str(stats['collisions']) + ' sub-frame keys snapping on an already keyed frame, snap them manually']]
+
+    return (status_flag,
+            analysis_report,
+            button_switch
+            )
+
+
+@qc_profiler.profile
+def in_betweens(button_clicked):
+    """
+    Main function called from the UI to check for gaps between keys with no in-betweens
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of control names and their gaps when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    in_betweens_report = {}
+
+    controls, characters = stream_stats(anim_curves.list_curves())
+
+    for control, stats in sorted(controls.items()):
+        if stats['gaps']:
+            status_flag = 'warning'
+
+            # Filling the list report
+            in_betweens_report[control] = [["<b style='color:rgb(255,165,0);'>In-Betweens warning:</b> " + 'Control ' + str(control) + ' has ' + str(stats['gaps']) + ' gaps above ' + str(MAX_GAP) + ' frames (biggest ' + str(round(stats['max_gap'], 2)) + ')']]
+
+    add_character_lines(in_betweens_report, characters)
+
+    # In-betweens are an animator's choice: no automatic fix, the report stays
+    if button_clicked == 'fix_button':
+        button_switch = 1
+
+    return (status_flag,
+            in_betweens_report,
+            button_switch
+            )
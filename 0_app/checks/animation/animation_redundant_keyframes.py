@@ -0,0 +1,202 @@
+# **************************************************************************************************************
+# content       = checks for keys that don't change the animation curves
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import numpy as np
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+from checks.animation import anim_curves
+
+# **************************************************************************************************************
+
+VALUE_TOLERANCE = 1e-4
+# Tangent angle (degrees) under which a tangent is flat
+ANGLE_TOLERANCE = 0.01
+LINEAR_TYPES = ['linear']
+# Out tangents holding the key's value until the next key
+STEP_TYPES = ['step', 'stepnext']
+
+
+def neighbour_redundant(curve_data, keys):
+    """
+    Vectorized test of 'keys' against the key before and the key after each of them,
+    the tangent masks are computed once for all the keys. A key is redundant either:
+        - flat: its value and the next one equal the previous one and every tangent in between is flat
+        - linear: it lies on the line from the previous key to the next one and every tangent in between is linear
+
+    Args:
+        curve_data (dict): From anim_curves.extract_curves()
+        keys (np.ndarray): Interior key indices of the flat arrays
+
+    Returns:
+        np.ndarray: bool per key, flat redundant
+        np.ndarray: bool per key, linear redundant
+    """
+    times, values = curve_data['times'], curve_data['values']
+    in_types, out_types = curve_data['in_types'], curve_data['out_types']
+    in_flat = np.abs(curve_data['in_angles']) <= ANGLE_TOLERANCE
+    out_flat = (np.abs(curve_data['out_angles']) <= ANGLE_TOLERANCE) | np.isin(out_types, STEP_TYPES)
+    in_linear = np.isin(in_types, LINEAR_TYPES)
+    out_linear = np.isin(out_types, LINEAR_TYPES)
+    starts, ends = keys - 1, keys + 1
+
+    flat = (np.abs(values[keys] - values[starts]) <= VALUE_TOLERANCE) & \
+           (np.abs(values[ends] - values[starts]) <= VALUE_TOLERANCE) & \
+           out_flat[starts] & in_flat[keys] & out_flat[keys] & in_flat[ends]
+
+    # Value the line between the previous and the next key would give at the key's time
+    blend = (times[keys] - times[starts]) / (times[ends] - times[starts])
+    line_values = values[starts] + blend * (values[ends] - values[starts])
+    linear = (np.abs(values[keys] - line_values) <= VALUE_TOLERANCE) & \
+             out_linear[starts] & in_linear[keys] & out_linear[keys] & in_linear[ends]
+
+    return flat, linear
+
+
+def group_cummax(values, groups):
+    """
+    Running maximum restarting on each group, without a loop: the values are replaced by their ranks,
+    offset by their group so a new group always starts above the previous one
+
+    Args:
+        values (np.ndarray): Floats
+        groups (np.ndarray): Non decreasing group index per value
+
+    Returns:
+        np.ndarray: Running maximum of the values inside each group
+    """
+    order = np.argsort(values, kind='stable')
+    ranks = np.empty(len(values), dtype=np.int64)
+    ranks[order] = np.arange(len(values))
+    offsets = groups.astype(np.int64) * len(values)
+    return values[order[np.maximum.accumulate(offsets + ranks) - offsets]]
+
+
+def redundant_keys(curve_data):
+    """
+    Finding the redundant keys of all the curves. The first and last keys of a curve are kept.
+    The interior keys redundant with their neighbours are the candidates, consecutive candidates of the
+    same kind (flat or linear) form a run anchored on the kept key before it. Each key of a run is then
+    checked against the anchor and the key after it, with every key of the run before it removed:
+        - flat: the values from the anchor up to the next key stay within the tolerance of the anchor's
+        - linear: the slope from the anchor to the next key stays inside the slope window of every removed key,
+          the running max / min of the windows' bounds
+    A run stops removing keys at its first failing key, everything is vectorized over the whole key buffer.
+
+    Args:
+        curve_data (dict): From anim_curves.extract_curves()
+
+    Returns:
+        np.ndarray: bool per key of the flat arrays, True when redundant
+    """
+    times, values = curve_data['times'], curve_data['values']
+    offsets = curve_data['offsets']
+
+    redundant = np.zeros(len(times), dtype=bool)
+    if len(times) < 3:
+        return redundant
+
+    # Interior keys of each curve have a previous and next key on the same curve
+    interior = np.ones(len(times), dtype=bool)
+    interior[offsets[:-1][np.diff(offsets) > 0]] = False
+    interior[offsets[1:][np.diff(offsets) > 0] - 1] = False
+    keys = np.nonzero(interior)[0]
+    flat, linear = neighbour_redundant(curve_data, keys)
+
+    # 1 for flat, 2 for linear candidates, flat first when both
+    kinds = np.zeros(len(times), dtype=np.int8)
+    kinds[keys[linear]] = 2
+    kinds[keys[flat]] = 1
+    candidates = np.nonzero(kinds)[0]
+    if not len(candidates):
+        return redundant
+    candidate_kinds = kinds[candidates]
+
+    # Runs split on gaps and kind changes, the first and last keys of a curve are never candidates
+    run_starts = np.ones(len(candidates), dtype=bool)
+    run_starts[1:] = (np.diff(candidates) != 1) | (np.diff(candidate_kinds) != 0)
+    runs = np.cumsum(run_starts) - 1
+    anchors = (candidates[run_starts] - 1)[runs]
+    ends = candidates + 1
+
+    # Flat: the key and the next one stay within the tolerance of the anchor
+    flat_valid = (np.abs(values[candidates] - values[anchors]) <= VALUE_TOLERANCE) & \
+                 (np.abs(values[ends] - values[anchors]) <= VALUE_TOLERANCE)
+
+    # Linear: each removed key bounds the slope from the anchor, the line to the next key must fit all the bounds
+    elapsed = times[candidates] - times[anchors]
+    change = values[candidates] - values[anchors]
+    lowest = group_cummax((change - VALUE_TOLERANCE) / elapsed, runs)
+    highest = -group_cummax(-(change + VALUE_TOLERANCE) / elapsed, runs)
+    slopes = (values[ends] - values[anchors]) / (times[ends] - times[anchors])
+    linear_valid = (lowest <= slopes) & (slopes <= highest)
+
+    # A key is removed when it and every key before it in its run are valid
+    failed = ~np.where(candidate_kinds == 1, flat_valid, linear_valid)
+    failures = np.cumsum(failed)
+    confirmed = failures == (failures - failed)[run_starts][runs]
+
+    # A run directly followed by another one keeps its last key, the next run is anchored on it
+    run_ends = np.append(run_starts[1:], True)
+    confirmed &= ~(run_ends & np.append(np.diff(candidates) == 1, False))
+
+    redundant[candidates[confirmed]] = True
+    return redundant
+
+
+@qc_profiler.profile
+def redundant_keyframes(button_clicked):
+    """
+    Main function called from the UI to check for redundant keyframes
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of curve names and their redundant keys when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    redundant_report = {}
+
+    curves = anim_curves.list_curves()
+    curve_data = anim_curves.extract_curves(curves)
+    redundant = redundant_keys(curve_data)
+    offsets = curve_data['offsets']
+
+    # Curve index of each redundant key, then the key index inside its curve
+    redundant_indices = np.nonzero(redundant)[0]
+    redundant_curves = anim_curves.curve_ids(offsets)[redundant_indices]
+    curve_keys = np.split(redundant_indices - offsets[redundant_curves],
+                          np.nonzero(np.diff(redundant_curves))[0] + 1) if len(redundant_indices) else []
+
+    # Running the check
+    if button_clicked == 'run_button':
+        for curve_index, key_indices in zip(np.unique(redundant_curves), curve_keys):
+            status_flag = 'failed'
+            curve = curves[curve_index]
+            frames = curve_data['times'][offsets[curve_index] + key_indices]
+
+            # Filling the list report
+            redundant_report[curve] = [["<b style='color:rgb(255,0,0);'>Redundant Keyframes failed:</b> " + 'Curve ' + str(curve) + ' has ' + str(len(key_indices)) + ' redundant keys at frames: ' + ', '.join(str(round(frame, 2)) for frame in frames[:20]) + (' ...' if len(frames) > 20 else '')]]
+
+    # Running the fix: one cutKey per curve
+    elif button_clicked == 'fix_button':
+        cmds.undoInfo(openChunk=True, chunkName='redundant_keyframes')
+        try:
+            for curve_index, key_indices in zip(np.unique(redundant_curves), curve_keys):
+                cmds.cutKey(curves[curve_index], index=anim_curves.index_ranges(key_indices), clear=True)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    return (status_flag,
+            redundant_report,
+            button_switch
+            )
@@ -0,0 +1,228 @@
+# **************************************************************************************************************
+# content       = checks that the referenced rigs of a shot haven't been broken locally (reference edits, constraints, keyed skinning)
+#
+# dependencies  = Maya
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import re
+import yaml
+from collections import Counter
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+
+# **************************************************************************************************************
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'data', 'project', 'reference_edits.yml'))
+
+# Edit string tokens, quoted or not
+TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+NUMBER = re.compile(r'^-?[0-9.]+(?:e-?[0-9]+)?$')
+# Constraint weight plugs, i.e.: 'W0', 'ctrlW1' alias or target[0].targetWeight
+WEIGHT_PLUG = re.compile(r'(?:W[0-9]+|targetWeight)$')
+
+
+def list_references():
+    """
+    Returns:
+        list: The loaded reference nodes of the scene
+    """
+    references = cmds.ls(type='reference') or []
+    return [reference for reference in references
+            if reference != 'sharedReferenceNode' and '_UNKNOWN_REF_NODE_' not in reference
+            and cmds.referenceQuery(reference, isLoaded=True)]
+
+
+def parse_edit(edit):
+    """
+    Splitting a reference edit string into its command, its plugs or nodes and its last value
+
+    Args:
+        edit (str): i.e.: 'disconnectAttr "ns:parentConstraint1.ctx" "ns:hips_jnt.tx"'
+
+    Returns:
+        str: The command i.e.: 'disconnectAttr'
+        list: The plugs or nodes, flags and numbers left out
+        str: The last token i.e.: the set value
+    """
+    tokens = [quoted or bare for quoted, bare in TOKEN.findall(edit)]
+    if not tokens:
+        return '', [], ''
+    targets = [token for token in tokens[1:] if token and not token.startswith('-') and not NUMBER.match(token)]
+    return tokens[0], targets, tokens[-1]
+
+
+def reference_state(reference, breaking):
+    """
+    Inspecting one reference with bulk queries: its successful and failed edits, its nodes,
+    its constraints and their outgoing connections, the animation curves its edits connect.
+
+    Args:
+        reference (str): Reference node name
+        breaking (list): Edit commands that break the rig
+
+    Returns:
+        dict: 'counts' (Counter of edit commands), 'breaking' and 'failed' edit strings,
+              'disconnected' constraints driving nothing, 'switched_off' constraints disabled with
+              their node state, 'keyed' constraint node states and skinCluster plugs driven by an animation
+              curve of the shot, 'weights' constraint weights set to 0 or keyed in the shot (i.e.: space switches)
+    """
+    edits = cmds.referenceQuery(reference, editStrings=True, successfulEdits=True, failedEdits=False) or []
+    failed = cmds.referenceQuery(reference, editStrings=True, successfulEdits=False, failedEdits=True) or []
+    nodes = cmds.referenceQuery(reference, nodes=True, dagPath=True) or []
+    constraints = set(cmds.ls(nodes, type='constraint') or [])
+    skin_clusters = set(cmds.ls(nodes, type='skinCluster') or [])
+
+    driving = set()
+    if constraints:
+        connections = cmds.listConnections(list(constraints), source=False, destination=True,
+                                           connections=True, plugs=True, skipConversionNodes=True) or []
+        driving = set(plug.split('.', 1)[0] for plug in connections[::2])
+
+    state = {'counts': Counter(), 'breaking': [], 'failed': failed,
+             'disconnected': sorted(constraints - driving), 'switched_off': [], 'keyed': [], 'weights': []}
+    connected = []
+    for edit in edits:
+        command, plugs, value = parse_edit(edit)
+        state['counts'][command] += 1
+        if command in breaking:
+            state['breaking'].append(edit)
+
+        # Source and destination plugs, the sources are type checked in one query below
+        elif command == 'connectAttr' and len(plugs) > 1:
+            connected.append((plugs[0].split('.', 1)[0], plugs[1]))
+
+        # A constraint weight set to 0, or the constraint disabled with its node state
+        elif command == 'setAttr' and plugs and plugs[0].split('.', 1)[0].rsplit('|', 1)[-1] in constraints:
+            plug = plugs[0]
+            off = NUMBER.match(value) and float(value) == 0
+            if WEIGHT_PLUG.search(plug) and off:
+                state['weights'].append(plug)
+            elif plug.endswith('.nodeState') and not off:
+                state['switched_off'].append(plug)
+
+    # A constraint weight, node state or skinCluster plug (i.e.: its weights) keyed in the shot
+    # An empty list would make 'ls' list every curve of the scene
+    curves = set(cmds.ls(list(set(source for source, _ in connected)), type='animCurve') or []) if connected else set()
+    for source, plug in connected:
+        node = plug.split('.', 1)[0].rsplit('|', 1)[-1]
+        if source not in curves:
+            continue
+        if node in constraints and WEIGHT_PLUG.search(plug):
+            state['weights'].append(plug)
+        elif node in skin_clusters or (node in constraints and plug.endswith('.nodeState')):
+            state['keyed'].append(plug)
+
+    return state
+
+
+def remove_edits(reference, state, breaking):
+    """
+    Removing the breaking edits and the switched off and keyed plugs' edits, the reference
+    has to be unloaded while its edits are removed. The constraint weights are animation, they are kept.
+
+    Args:
+        reference (str): Reference node name
+        state (dict): From reference_state()
+        breaking (list): Edit commands that break the rig
+    """
+    cmds.file(unloadReference=reference)
+    try:
+        for command in breaking:
+            if state['counts'][command]:
+                cmds.referenceEdit(reference, editCommand=command, removeEdits=True,
+                                   successfulEdits=True, failedEdits=True)
+        for plug in state['switched_off']:
+            cmds.referenceEdit(plug, editCommand='setAttr', removeEdits=True, successfulEdits=True, failedEdits=True)
+        for plug in state['keyed']:
+            cmds.referenceEdit(plug, editCommand='connectAttr', removeEdits=True, successfulEdits=True, failedEdits=True)
+    finally:
+        cmds.file(loadReference=reference)
+
+
+def states_report(states):
+    """
+    Args:
+        states (dict): Reference name as key, dict from reference_state() as value
+
+    Returns:
+        str: 'failed' when a rig is broken, 'warning' when only constraint weights are animated, else 'passed'
+        dict: Reference name as key, list of the report lines list as value, for the references with issues
+    """
+    status_flag = 'passed'
+    rigging_report = {}
+    for reference, state in sorted(states.items()):
+        report_list = []
+        for edit in state['breaking']:
+            report_list.append("<b style='color:rgb(255,0,0);'>Rigging Checks failed:</b> " + 'Reference ' + str(reference) + ' has a breaking edit: ' + edit)
+        for edit in state['failed']:
+            report_list.append("<b style='color:rgb(255,0,0);'>Rigging Checks failed:</b> " + 'Reference ' + str(reference) + ' has an edit the published rig no longer matches: ' + edit)
+        for constraint in state['disconnected']:
+            report_list.append("<b style='color:rgb(255,0,0);'>Rigging Checks failed:</b> " + 'Constraint ' + str(constraint) + ' is not driving anything')
+        for plug in state['switched_off']:
+            report_list.append("<b style='color:rgb(255,0,0);'>Rigging Checks failed:</b> " + 'Constraint plug ' + str(plug) + ' is switched off in the shot')
+        for plug in state['keyed']:
+            report_list.append("<b style='color:rgb(255,0,0);'>Rigging Checks failed:</b> " + 'Rig plug ' + str(plug) + ' is keyed in the shot')
+        if report_list:
+            status_flag = 'failed'
+
+        for plug in state['weights']:
+            report_list.append("<b style='color:rgb(255,165,0);'>Rigging Checks warning:</b> " + 'Constraint weight ' + str(plug) + ' is set to 0 or keyed in the shot')
+        if state['weights'] and status_flag == 'passed':
+            status_flag = 'warning'
+
+        if report_list:
+            edit_counts = ', '.join(command + ': ' + str(count) for command, count in sorted(state['counts'].items()))
+            report_list.append('Reference ' + str(reference) + ' edits: ' + (edit_counts or 'none'))
+            rigging_report[reference] = [report_list]
+
+    return status_flag, rigging_report
+
+
+@qc_profiler.profile
+def rigging_checks(button_clicked):
+    """
+    Main function called from the UI to check the referenced rigs of the shot
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of reference names and their broken edits and constraints when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    rigging_report = {}
+
+    with open(RULES_PATH, 'r') as stream:
+        rules = yaml.load(stream, Loader=yaml.FullLoader)['Animation']
+
+    states = {reference: reference_state(reference, rules['breaking']) for reference in list_references()}
+
+    # Running the check
+    if button_clicked == 'run_button':
+        status_flag, rigging_report = states_report(states)
+
+    # Running the fix: removing the breaking edits, reference by reference
+    elif button_clicked == 'fix_button':
+        for reference, state in states.items():
+            if state['breaking'] or state['switched_off'] or state['keyed']:
+                remove_edits(reference, state, rules['breaking'])
+
+        # Failed edits and disconnected constraints need the rig to be republished and the constraint
+        # weights are left to the animators: the references are checked again and what remains stays in the report
+        status_flag, rigging_report = states_report({reference: reference_state(reference, rules['breaking'])
+                                                     for reference in list_references()})
+        if rigging_report:
+            button_switch = 1
+
+    return (status_flag,
+            rigging_report,
+            button_switch
+            )
@@ -0,0 +1,147 @@
+# **************************************************************************************************************
+# content       = checks the display and animation layers against the 'layer_rules.yml' rules
+#
+# dependencies  = Maya
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import yaml
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+
+# **************************************************************************************************************
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'data', 'project', 'layer_rules.yml'))
+
+DEFAULT_LAYERS = ['defaultLayer', 'BaseAnimation']
+
+
+def layer_membership():
+    """
+    Building the layer membership map of the scene with one query per kind of layer
+
+    Returns:
+        dict: Display layer name as key, set of member long names as value
+        dict: Animation layer name as key, list of its attributes as value
+    """
+    display_layers = [layer for layer in cmds.ls(type='displayLayer') or [] if layer not in DEFAULT_LAYERS]
+    display_members = {layer: set() for layer in display_layers}
+    if display_layers:
+        # Pairs of (layer.drawInfo, member) for all the layers at once
+        connections = cmds.listConnections([layer + '.drawInfo' for layer in display_layers], source=False,
+                                           destination=True, connections=True, plugs=False) or []
+        members = cmds.ls(connections[1::2], long=True) or []
+        for layer_plug, member in zip(connections[::2], members):
+            display_members[layer_plug.split('.', 1)[0]].add(member)
+
+    anim_members = {}
+    for layer in cmds.ls(type='animLayer') or []:
+        if layer not in DEFAULT_LAYERS:
+            anim_members[layer] = cmds.animLayer(layer, query=True, attribute=True) or []
+
+    return display_members, anim_members
+
+
+def orphan_geometry(layer_members):
+    """
+    Returns the meshes' transforms that are not in the layer, directly or through a parent
+
+    Args:
+        layer_members (set): Long names of the layer's members
+
+    Returns:
+        list: Long names of the orphan transforms
+    """
+    transforms = sorted(set(mesh.rsplit('|', 1)[0] for mesh in cmds.ls(type='mesh', long=True, noIntermediate=True) or []))
+    orphans = []
+    for transform in transforms:
+        parts = transform.split('|')
+        if not any('|'.join(parts[:depth]) in layer_members for depth in range(2, len(parts) + 1)):
+            orphans.append(transform)
+    return orphans
+
+
+def layer_organization(department, button_clicked):
+    """
+    Checking or fixing the layers of a department
+
+    Args:
+        department (str): i.e.: 'Rigging' or 'Animation'
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of layer and node names when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    layers_report = {}
+
+    with open(RULES_PATH, 'r') as stream:
+        rules = yaml.load(stream, Loader=yaml.FullLoader)[department]
+
+    display_members, anim_members = layer_membership()
+
+    missing_display = [layer for layer in rules['display_layers'] if layer not in display_members]
+    missing_anim = [layer for layer in rules['anim_layers'] if layer not in anim_members]
+    empty_layers = []
+    if not rules['allow_empty']:
+        empty_layers = [layer for layer, members in display_members.items() if not members and layer not in rules['display_layers']]
+        empty_layers += [layer for layer, members in anim_members.items() if not members and layer not in rules['anim_layers']]
+    orphans = []
+    if rules['geometry_layer']:
+        orphans = orphan_geometry(display_members.get(rules['geometry_layer'], set()))
+
+    # Running the check
+    if button_clicked == 'run_button':
+        # Filling the list report
+        for layer in missing_display + missing_anim:
+            layers_report[layer] = [["<b style='color:rgb(255,0,0);'>Layer Organization failed:</b> " + 'Layer ' + str(layer) + ' is missing']]
+        for layer in empty_layers:
+            layers_report[layer] = [["<b style='color:rgb(255,0,0);'>Layer Organization failed:</b> " + 'Layer ' + str(layer) + ' is empty']]
+        for transform in orphans:
+            layers_report[transform] = [["<b style='color:rgb(255,0,0);'>Layer Organization failed:</b> " + 'Object ' + str(transform.rsplit('|', 1)[-1]) + ' is not in the ' + rules['geometry_layer'] + ' layer']]
+
+        if layers_report:
+            status_flag = 'failed'
+
+    # Running the fix
+    elif button_clicked == 'fix_button':
+        cmds.undoInfo(openChunk=True, chunkName='layer_organization')
+        try:
+            if empty_layers:
+                cmds.delete(empty_layers)
+            for layer in missing_display:
+                cmds.createDisplayLayer(name=layer, empty=True)
+            for layer in missing_anim:
+                cmds.animLayer(layer)
+            if orphans:
+                cmds.editDisplayLayerMembers(rules['geometry_layer'], orphans, noRecurse=True)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    return (status_flag,
+            layers_report,
+            button_switch
+            )
+
+
+@qc_profiler.profile
+def rigging_layer_organization(button_clicked):
+    """
+    Main function called from the UI to check the Rigging layers
+    """
+    return layer_organization('Rigging', button_clicked)
+
+
+@qc_profiler.profile
+def animation_layer_organization(button_clicked):
+    """
+    Main function called from the UI to check the Animation layers
+    """
+    return layer_organization('Animation', button_clicked)
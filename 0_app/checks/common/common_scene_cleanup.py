@@ -0,0 +1,216 @@
+# **************************************************************************************************************
+# content       = mark and sweep Scene Cleanup: reports and deletes the nodes nothing in the scene depends on
+#
+# dependencies  = Maya
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import yaml
+from collections import deque
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+
+# **************************************************************************************************************
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'data', 'project', 'scene_cleanup.yml'))
+
+UNKNOWN_TYPES = ['unknown', 'unknownDag', 'unknownTransform']
+# Deleting a DAG node deletes its children: these are only swept without descendants
+UNKNOWN_DAG_TYPES = ['unknownDag', 'unknownTransform']
+
+# Unreachable names shown per category line
+REPORT_LIMIT = 50
+
+
+def scene_graph():
+    """
+    Building the scene's node types and undirected adjacency with one 'ls' and one 'listConnections'
+
+    Returns:
+        dict: Node name as key, exact node type as value
+        dict: Node name as key, list of connected node names as value
+    """
+    listing = cmds.ls(showType=True) or []
+    node_types = dict(zip(listing[::2], listing[1::2]))
+
+    adjacency = {node: [] for node in node_types}
+    # Pairs of (node.plug, other node), every connection is seen from both of its ends
+    connections = cmds.listConnections(list(node_types), connections=True, plugs=False) or []
+    for plug, other in zip(connections[::2], connections[1::2]):
+        node = plug.split('.', 1)[0]
+        if node in adjacency:
+            adjacency[node].append(other)
+
+    return node_types, adjacency
+
+
+def mark(adjacency, roots, hubs):
+    """
+    Breadth first marking of everything reachable from the roots, in O(nodes + connections).
+    Hubs are marked when reached but never walked through, otherwise every node would be reachable.
+
+    Args:
+        adjacency (dict): From scene_graph()
+        roots (list): Node names the marking starts from
+        hubs (set): Node names not to walk through
+
+    Returns:
+        set: The reachable node names
+    """
+    marked = set(roots)
+    queue = deque(root for root in marked if root not in hubs)
+    while queue:
+        for other in adjacency.get(queue.popleft(), ()):
+            if other not in marked:
+                marked.add(other)
+                if other not in hubs:
+                    queue.append(other)
+    return marked
+
+
+def root_nodes(root_types):
+    """
+    The scene's entry points: the assemblies, the sets (shading engines excluded), the non intermediate
+    nodes of the root types and every transform above them
+
+    Args:
+        root_types (list): i.e.: renderable shapes, joints, cameras and lights
+
+    Returns:
+        list: Node names, as listed by scene_graph()
+    """
+    paths = set()
+    for node in cmds.ls(type=root_types, long=True, noIntermediate=True) or []:
+        parts = node.split('|')
+        paths.update('|'.join(parts[:index]) for index in range(2, len(parts) + 1))
+
+    roots = (cmds.ls(list(paths)) or []) if paths else []
+
+    # The shading engines are sets too, as roots they would keep every unused shader
+    shading_engines = set(cmds.ls(type='shadingEngine') or [])
+    sets = [node for node in cmds.ls(sets=True) or [] if node not in shading_engines]
+    return roots + (cmds.ls(assemblies=True) or []) + sets
+
+
+def unreachable_nodes(department):
+    """
+    Marking from the scene's entry points and sweeping the unreachable nodes of the sweep types,
+    minus the protected nodes: default, referenced, locked and undeletable nodes.
+    Unknown nodes are swept only when they have no connections and, for DAG ones, no descendants.
+
+    Args:
+        department (str): i.e.: 'Rigging' or 'Animation'
+
+    Returns:
+        dict: Unreachable node name as key, exact node type as value
+    """
+    with open(RULES_PATH, 'r') as stream:
+        rules = yaml.load(stream, Loader=yaml.FullLoader)[department]
+
+    node_types, adjacency = scene_graph()
+    default_nodes = set(cmds.ls(defaultNodes=True) or [])
+    hubs = default_nodes | set(node for node, node_type in node_types.items() if node_type in rules['hub_types'])
+    marked = mark(adjacency, root_nodes(rules['root_types']) + list(default_nodes), hubs)
+
+    protected = set(default_nodes)
+    protected.update(cmds.ls(referencedNodes=True) or [])
+    protected.update(cmds.ls(lockedNodes=True) or [])
+    protected.update(cmds.ls(undeletable=True) or [])
+
+    candidates = set(node for node in cmds.ls(type=rules['sweep_types']) or [] if node not in marked)
+    for node in cmds.ls(type=UNKNOWN_TYPES) or []:
+        if adjacency.get(node) or (node_types.get(node) in UNKNOWN_DAG_TYPES
+                                   and cmds.listRelatives(node, allDescendents=True)):
+            continue
+        candidates.add(node)
+
+    return {node: node_types[node] for node in candidates if node in node_types and node not in protected}
+
+
+def categorize(unreachable):
+    """
+    Sorting the unreachable nodes into report categories with bulk 'ls' queries
+
+    Args:
+        unreachable (dict): From unreachable_nodes()
+
+    Returns:
+        dict: Category as key, sorted node names as value
+    """
+    shading = set(cmds.ls(list(unreachable), materials=True) or [])
+    shading.update(cmds.ls(list(unreachable), textures=True) or [])
+    shading.update(cmds.ls(list(unreachable), type='shadingEngine') or [])
+
+    categories = {'Unknown nodes': [], 'Shading networks': [], 'Utility nodes': []}
+    for node, node_type in sorted(unreachable.items()):
+        if node_type in UNKNOWN_TYPES:
+            categories['Unknown nodes'].append(node)
+        elif node in shading:
+            categories['Shading networks'].append(node)
+        else:
+            categories['Utility nodes'].append(node)
+
+    return {category: nodes for category, nodes in categories.items() if nodes}
+
+
+def scene_cleanup(department, button_clicked):
+    """
+    Checking or sweeping the department's unreachable nodes
+
+    Args:
+        department (str): i.e.: 'Rigging' or 'Animation'
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of unreachable node names per category when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    cleanup_report = {}
+
+    unreachable = unreachable_nodes(department)
+
+    # Running the check
+    if button_clicked == 'run_button':
+        if unreachable:
+            status_flag = 'failed'
+
+            # Filling the list report
+            for category, nodes in categorize(unreachable).items():
+                cleanup_report[category] = [["<b style='color:rgb(255,0,0);'>Scene Cleanup failed:</b> " + str(len(nodes)) + ' ' + category.lower() + ' not used by the scene: ' + ', '.join(nodes[:REPORT_LIMIT]) + (' ...' if len(nodes) > REPORT_LIMIT else '')]]
+
+    # Running the fix: sweeping everything in one delete
+    elif button_clicked == 'fix_button':
+        if unreachable:
+            cmds.undoInfo(openChunk=True, chunkName='scene_cleanup')
+            try:
+                cmds.delete(list(unreachable))
+            finally:
+                cmds.undoInfo(closeChunk=True)
+
+    return (status_flag,
+            cleanup_report,
+            button_switch
+            )
+
+
+@qc_profiler.profile
+def rigging_scene_cleanup(button_clicked):
+    """
+    Main function called from the UI to check the Rigging scene for unused nodes
+    """
+    return scene_cleanup('Rigging', button_clicked)
+
+
+@qc_profiler.profile
+def animation_scene_cleanup(button_clicked):
+    """
+    Main function called from the UI to check the Animation scene for unused nodes
+    """
+    return scene_cleanup('Animation', button_clicked)
@@ -0,0 +1,193 @@
+# **************************************************************************************************************
+# content       = bulk extraction of the scene's meshes into numpy arrays
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from scripts import qc_logger
+
+# **************************************************************************************************************
+
+LOG = qc_logger.init()
+
+
+def list_meshes():
+    """
+    Returns:
+        list: Long names of all the non intermediate mesh shapes in the scene
+    """
+    return cmds.ls(type='mesh', long=True, noIntermediate=True) or []
+
+
+def extract_meshes(meshes, space=om.MSpace.kObject):
+    """
+    Reading the points and the face-vertex lists of 'meshes' from one selection list.
+    Maya's API isn't thread safe: the extraction runs on the main thread, the arrays can then
+    be processed by worker threads.
+
+    Args:
+        meshes (list): Mesh shape long names
+        space (int): om.MSpace of the points
+
+    Returns:
+        dict: Mesh name as key, dict of 'points' (vertices, 3), 'counts' (faces) vertex count per face,
+              'offsets' (faces + 1) start of each face in 'vertices', 'vertices' (face-vertices) as value
+    """
+    selection = om.MSelectionList()
+    for mesh in meshes:
+        selection.add(mesh)
+
+    mesh_data = {}
+    for index, mesh in enumerate(meshes):
+        mesh_fn = om.MFnMesh(selection.getDagPath(index))
+        counts, vertices = mesh_fn.getVertices()
+        counts = np.array(counts, dtype=np.int64)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        mesh_data[mesh] = {'points': np.array(mesh_fn.getPoints(space), dtype=np.float64).reshape(-1, 4)[:, :3],
+                           'counts': counts,
+                           'offsets': offsets,
+                           'vertices': np.array(vertices, dtype=np.int64)}
+
+    return mesh_data
+
+
+def extract_uvs(meshes, uv_set=None):
+    """
+    Reading the UVs, the face-UV lists and the UV shells of 'meshes' from one selection list
+
+    Args:
+        meshes (list): Mesh shape long names
+        uv_set (str): UV set name, the current one when None
+
+    Returns:
+        dict: Mesh name as key, dict of 'uvs' (UVs, 2), 'counts' (faces) UV count per face (0 when unmapped),
+              'offsets' (faces + 1) start of each face in 'uv_ids', 'uv_ids' (face-UVs) and
+              'shells' (UVs) shell index of each UV as value
+    """
+    selection = om.MSelectionList()
+    for mesh in meshes:
+        selection.add(mesh)
+
+    uv_data = {}
+    for index, mesh in enumerate(meshes):
+        mesh_fn = om.MFnMesh(selection.getDagPath(index))
+        uv_set_name = uv_set or mesh_fn.currentUVSetName()
+        us, vs = mesh_fn.getUVs(uv_set_name)
+        counts, uv_ids = mesh_fn.getAssignedUVs(uv_set_name)
+        counts = np.array(counts, dtype=np.int64)
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+
+        uv_data[mesh] = {'uvs': np.stack([np.array(us, dtype=np.float64), np.array(vs, dtype=np.float64)], axis=1),
+                         'counts': counts,
+                         'offsets': offsets,
+                         'uv_ids': np.array(uv_ids, dtype=np.int64),
+                         'shells': np.array(mesh_fn.getUvShellsIds(uv_set_name)[1], dtype=np.int64) if len(us) else np.zeros(0, dtype=np.int64)}
+
+    return uv_data
+
+
+def extract_normals(meshes, geometry):
+    """
+    Reading the normal ids and the locked state of every face-vertex of 'meshes': the normal ids from
+    one selection list, the locked states with one 'polyNormalPerVertex' query per mesh.
+
+    Args:
+        meshes (list): Mesh shape long names
+        geometry (dict): From extract_meshes(), for the face-vertex order
+
+    Returns:
+        dict: Mesh name as key, dict of 'normal_ids' (face-vertices) and 'locked' (face-vertices) bools as value
+    """
+    selection = om.MSelectionList()
+    for mesh in meshes:
+        selection.add(mesh)
+
+    normal_data = {}
+    for index, mesh in enumerate(meshes):
+        mesh_fn = om.MFnMesh(selection.getDagPath(index))
+        normal_ids = np.array(mesh_fn.getNormalIds()[1], dtype=np.int64)
+
+        # The query lists the vertex-faces sorted by vertex then face, put back in face-vertex order
+        vertices = geometry[mesh]['vertices']
+        locked = np.zeros(len(vertices), dtype=bool)
+        frozen = cmds.polyNormalPerVertex(mesh + '.vtxFace[*][*]', query=True, freezeNormal=True) or []
+        if len(frozen) == len(vertices):
+            locked[np.lexsort((face_ids(geometry[mesh]['offsets']), vertices))] = frozen
+        else:
+            LOG.warning('%s: %d locked normal states for %d face-vertices, locked normals not checked',
+                        mesh, len(frozen), len(vertices))
+
+        normal_data[mesh] = {'normal_ids': normal_ids, 'locked': locked}
+
+    return normal_data
+
+
+def edge_indices(mesh, edges):
+    """
+    Returns the edge indices of vertex pairs, from one 'polyInfo' query on the mesh
+
+    Args:
+        mesh (str): Mesh shape long name
+        edges (np.ndarray): (edges, 2) low and high vertex of each edge
+
+    Returns:
+        list: Maya edge index of each pair
+    """
+    # Lines like 'EDGE      0:      0      1  Hard'
+    edge_vertices = {}
+    for line in cmds.polyInfo(mesh, edgeToVertex=True) or []:
+        index, vertex_pair = line.split(':', 1)
+        low, high = sorted(int(vertex) for vertex in vertex_pair.split()[:2])
+        edge_vertices[(low, high)] = int(index.split()[-1])
+    return [edge_vertices[(int(low), int(high))] for low, high in edges]
+
+
+def face_ids(offsets):
+    """
+    Returns:
+        np.ndarray: Face index of each face-vertex, from the face offsets
+    """
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def next_corners(offsets):
+    """
+    Returns:
+        np.ndarray: Index of the next face-vertex of the same face, wrapping on the face's first one
+    """
+    corners = np.arange(offsets[-1]) + 1
+    corners[offsets[1:][np.diff(offsets) > 0] - 1] = offsets[:-1][np.diff(offsets) > 0]
+    return corners
+
+
+def face_area_vectors(data):
+    """
+    Vectorized sum of every face's corner cross products around its first vertex (a triangle fan):
+    the direction is the face normal, the norm twice the face area.
+
+    Args:
+        data (dict): One mesh from extract_meshes()
+
+    Returns:
+        np.ndarray: (faces, 3) area vector per face
+    """
+    points, offsets, vertices = data['points'], data['offsets'], data['vertices']
+    origins = points[vertices[offsets[:-1]]][face_ids(offsets)]
+    cross = np.cross(points[vertices] - origins, points[vertices[next_corners(offsets)]] - origins)
+    return np.add.reduceat(cross, offsets[:-1], axis=0)
+
+
+def transform_name(mesh):
+    """
+    Returns the mesh shape's transform long name
+    """
+    return mesh.rsplit('|', 1)[0]
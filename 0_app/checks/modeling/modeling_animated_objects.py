@@ -8,6 +8,8 @@
 
 import maya.cmds as cmds
 
+from scripts import qc_profiler
+
 # **************************************************************************************************************
 
 
@@ -39,6 +41,7 @@ def delete_keyframes(obj, attribute):
     cmds.cutKey(full_attribute, clear=True)
 
 
+@qc_profiler.profile
 def animated_objects(button_clicked):
     """
     Main function called from the UI to check if objects have animated attributes
@@ -70,11 +73,11 @@ def animated_objects(button_clicked):
     # Running the check
     if button_clicked == 'run_button':
         animated_objects_report = {}
-        report_list = []
-        
+
         # Check if object has keyframes
         for asset_mesh in polygon_meshes:
             transform = cmds.listRelatives(asset_mesh, parent=True)[0]
+            report_list = []
 
             # Calling function to retrieve attributes
             animated_attribs = list_animated_attributes(transform)
@@ -92,8 +95,6 @@ def animated_objects(button_clicked):
                 report_list.append("<b style='color:rgb(255,0,0);'>Animated Objects failed:</b> " + 'Object ' + str(transform) + ' has keyframes on the following attributes: ' + string_to_append)
                 
                 animated_objects_report[transform].append(report_list)
-            else:
-                status_flag = 'passed'
     
     # Running the fix    
     elif button_clicked == 'fix_button':
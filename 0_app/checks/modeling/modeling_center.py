@@ -1,16 +1,119 @@
 # **************************************************************************************************************
 # content       = checks if the asset is in the world center
 #
-# dependencies  = Maya
+# dependencies  = Maya, numpy
 #
 # author  = Stephane Barbin
 # **************************************************************************************************************
 
+import numpy as np
 import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from scripts import qc_profiler
 
 # **************************************************************************************************************
 
+# 'bounding_box': the world bounding box is centered on the origin and sits on the ground plane
+# 'translate': the translate values are zero
+CENTER_MODE = 'bounding_box'
+TOLERANCE = 1e-3
+
+DEFAULT_CAMERAS = ['persp', 'top', 'front', 'side']
+
+
+def candidate_shapes():
+    """
+    Listing the top level objects holding a mesh, with one 'listRelatives' for all of them
+
+    Returns:
+        dict: Top level transform long name as key, list of its mesh shapes as value
+    """
+    top_level_objects = [top_object for top_object in cmds.ls(assemblies=True, long=True) or []
+                         if top_object.lstrip('|') not in DEFAULT_CAMERAS]
+    if not top_level_objects:
+        return {}
+
+    transform_shapes = {}
+    for shape in cmds.listRelatives(top_level_objects, shapes=True, type='mesh', fullPath=True, noIntermediate=True) or []:
+        transform_shapes.setdefault(shape.rsplit('|', 1)[0], []).append(shape)
+    return transform_shapes
+
 
+def world_bounds(shapes):
+    """
+    World bounding boxes of all the shapes in one batch: the object space boxes and the world matrices
+    are read from one selection list, the 8 corners of every box are transformed at once.
+
+    Args:
+        shapes (list): Shape long names
+
+    Returns:
+        np.ndarray: (shapes, 3) world minimums
+        np.ndarray: (shapes, 3) world maximums
+    """
+    selection = om.MSelectionList()
+    for shape in shapes:
+        selection.add(shape)
+
+    minimums = np.empty((len(shapes), 3))
+    maximums = np.empty((len(shapes), 3))
+    matrices = np.empty((len(shapes), 4, 4))
+    for index in range(len(shapes)):
+        dag_path = selection.getDagPath(index)
+        box = om.MFnDagNode(dag_path).boundingBox
+        minimums[index] = list(box.min)[:3]
+        maximums[index] = list(box.max)[:3]
+        matrices[index] = np.array(list(dag_path.inclusiveMatrix())).reshape(4, 4)
+
+    # (shapes, 8, 4) homogeneous corners, Maya's row vector convention: corner * matrix
+    corners = np.ones((len(shapes), 8, 4))
+    for corner in range(8):
+        for axis in range(3):
+            corners[:, corner, axis] = maximums[:, axis] if corner >> axis & 1 else minimums[:, axis]
+    world_corners = np.einsum('nci,nij->ncj', corners, matrices)[:, :, :3]
+
+    return world_corners.min(axis=1), world_corners.max(axis=1)
+
+
+def bounding_box_offsets(transform_shapes):
+    """
+    Vectorized offsets of the world bounding boxes: the box center to the origin on X and Z,
+    the box bottom to the ground plane on Y
+
+    Args:
+        transform_shapes (dict): From candidate_shapes()
+
+    Returns:
+        np.ndarray: (transforms, 3) offset of each transform, zero within TOLERANCE
+    """
+    transforms = sorted(transform_shapes)
+    shapes = [shape for transform in transforms for shape in transform_shapes[transform]]
+    shape_minimums, shape_maximums = world_bounds(shapes)
+
+    # Union of the boxes of each transform's shapes
+    starts = np.cumsum([0] + [len(transform_shapes[transform]) for transform in transforms[:-1]])
+    minimums = np.minimum.reduceat(shape_minimums, starts, axis=0)
+    maximums = np.maximum.reduceat(shape_maximums, starts, axis=0)
+
+    offsets = (minimums + maximums) / 2.0
+    offsets[:, 1] = minimums[:, 1]
+    offsets[np.abs(offsets) <= TOLERANCE] = 0.0
+    return offsets
+
+
+def translate_offsets(transforms):
+    """
+    Args:
+        transforms (list): Transform long names
+
+    Returns:
+        np.ndarray: (transforms, 3) translate values of each transform
+    """
+    return np.array([cmds.getAttr(transform + '.translate')[0] for transform in transforms]).reshape(-1, 3)
+
+
+@qc_profiler.profile
 def meshes_center(button_clicked):
     """
     Main function called from the UI to check if objects are centered in world
@@ -24,65 +127,45 @@ def meshes_center(button_clicked):
         int: A flag sent back to the main: 0 for passed, 1 for failed
     """
     status_flag = 'passed'
-    default_cameras = ['persp', 'top', 'front', 'side']
     button_switch = 0
+    center_report = {}
 
-    top_level_objects = cmds.ls(assemblies=True)
-
-    # List of "mesh" type objects for the qc check
-    polygon_meshes = []
-
-    for top_object in top_level_objects:
-        if top_object not in default_cameras:
-            shape_objects = cmds.listRelatives(top_object, shapes=True) or []
-            for shape in shape_objects:
-                if cmds.nodeType(shape) == 'mesh':
-                    polygon_meshes.append(shape)
-                    break
+    transform_shapes = candidate_shapes()
+    transforms = sorted(transform_shapes)
+    if CENTER_MODE == 'bounding_box':
+        offsets = bounding_box_offsets(transform_shapes) if transforms else np.zeros((0, 3))
+    else:
+        offsets = translate_offsets(transforms)
+    off_center = np.nonzero(np.any(offsets != 0, axis=1))[0]
 
     # Running the check
     if button_clicked == 'run_button':
-        center_report = {}
-        report_list = []
-
-        # Check if centered
-        for asset_mesh in polygon_meshes:
-            transform = cmds.listRelatives(asset_mesh, parent=True)[0]
-
-            # Assigning position x, y z
-            asset_posx = cmds.getAttr(transform + '.translateX')
-            asset_posy = cmds.getAttr(transform + '.translateY')
-            asset_posz = cmds.getAttr(transform + '.translateZ')
-
-            asset_posx_rounded = round((asset_posx), 2)
-            asset_posy_rounded = round((asset_posy), 2)
-            asset_posz_rounded = round((asset_posz), 2)
-
-            # If not in center of word
-            if asset_posx != 0 or asset_posy != 0 or asset_posz != 0:
-                status_flag = 'failed'
-
-                # Filling the list report
-                if transform not in center_report:
-                    center_report[transform] = []
-                report_list.append("<b style='color:rgb(255,0,0);'>Center failed:</b> " + 'Object ' + str(transform) + ' position ' + 'is: ' + str(asset_posx_rounded) + ' ,' + str(asset_posy_rounded) + ' ,' + str(asset_posz_rounded))
-                center_report[transform].append(report_list)
-            else:
-                status_flag = 'passed'
-        
+        if len(off_center):
+            status_flag = 'failed'
+
+            # Filling the list report
+            for index in off_center:
+                transform = transforms[index]
+                position = ' ,'.join(str(round(float(value), 2)) for value in offsets[index])
+                if CENTER_MODE == 'bounding_box':
+                    center_report[transform] = [["<b style='color:rgb(255,0,0);'>Center failed:</b> " + 'Object ' + str(transform.rsplit('|', 1)[-1]) + ' bounding box center (X, Z) and bottom (Y) ' + 'is: ' + position]]
+                else:
+                    center_report[transform] = [["<b style='color:rgb(255,0,0);'>Center failed:</b> " + 'Object ' + str(transform.rsplit('|', 1)[-1]) + ' position ' + 'is: ' + position]]
+
     # Running the fix
     elif button_clicked == 'fix_button':
-        status_flag = 'passed'
-        center_report = {}
-        report_list = []
-
-        # Putting in center of world
-        for asset_mesh in polygon_meshes:
-            transform = cmds.listRelatives(asset_mesh, parent=True)[0]
-            cmds.setAttr(transform + '.translateX', 0)
-            cmds.setAttr(transform + '.translateY', 0)
-            cmds.setAttr(transform + '.translateZ', 0)
-    
+        cmds.undoInfo(openChunk=True, chunkName='meshes_center')
+        try:
+            for index in off_center:
+                transform = transforms[index]
+                # Moving the bounding box back on the origin, or putting the translate values in center of world
+                if CENTER_MODE == 'bounding_box':
+                    cmds.move(*[-float(value) for value in offsets[index]], transform, relative=True, worldSpace=True)
+                else:
+                    cmds.setAttr(transform + '.translate', 0, 0, 0)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
     return (status_flag,
             center_report,
             button_switch
@@ -0,0 +1,221 @@
+# **************************************************************************************************************
+# content       = checks for stacked duplicate meshes (geometry hashing) and overlapping meshes (spatial grid)
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import hashlib
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+
+from scripts import qc_profiler
+from checks.modeling import mesh_data
+
+# **************************************************************************************************************
+
+# World space point resolution of the fingerprints, in scene units
+QUANTIZE = 1e-3
+# Shared volume, relative to the bigger bounding box, above which two meshes overlap (stacked instances)
+OVERLAP_RATIO = 0.5
+# Bounding boxes spanning more grid cells than this are tested against all the others
+MAX_CELLS = 64
+
+
+def fingerprint(data):
+    """
+    Hashing a mesh on its vertex and face counts and its quantized world space points
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes()
+
+    Returns:
+        str: The mesh's fingerprint
+    """
+    points = np.round(data['points'] / QUANTIZE).astype(np.int64)
+    header = np.array([len(points), len(data['counts'])], dtype=np.int64)
+    return hashlib.sha1(header.tobytes() + points.tobytes()).hexdigest()
+
+
+def duplicate_groups(meshes, data):
+    """
+    Grouping the meshes by fingerprint, in linear time
+
+    Args:
+        meshes (list): Mesh shape long names
+        data (dict): From mesh_data.extract_meshes()
+
+    Returns:
+        list: Groups (sorted lists) of duplicate meshes, the first one is kept by the fix
+    """
+    groups = {}
+    for mesh in meshes:
+        groups.setdefault(fingerprint(data[mesh]), []).append(mesh)
+    return [sorted(group) for group in groups.values() if len(group) > 1]
+
+
+def overlap_pairs(meshes, data):
+    """
+    Finding the meshes whose bounding boxes share more than OVERLAP_RATIO of the bigger one's volume.
+    The boxes are binned in a uniform grid sized on the median box, only boxes sharing a cell are compared.
+
+    Args:
+        meshes (list): Mesh shape long names
+        data (dict): From mesh_data.extract_meshes()
+
+    Returns:
+        list: (mesh, mesh) overlapping pairs
+    """
+    meshes = [mesh for mesh in meshes if len(data[mesh]['points'])]
+    if len(meshes) < 2:
+        return []
+
+    minimums = np.array([data[mesh]['points'].min(axis=0) for mesh in meshes])
+    maximums = np.array([data[mesh]['points'].max(axis=0) for mesh in meshes])
+    extents = maximums - minimums
+    cell_size = max(float(np.median(extents.max(axis=1))), QUANTIZE)
+
+    low_cells = np.floor(minimums / cell_size).astype(np.int64)
+    high_cells = np.floor(maximums / cell_size).astype(np.int64)
+    cell_counts = np.prod(high_cells - low_cells + 1, axis=1)
+
+    grid = {}
+    large = []
+    for index in range(len(meshes)):
+        if cell_counts[index] > MAX_CELLS:
+            large.append(index)
+            continue
+        for x in range(low_cells[index, 0], high_cells[index, 0] + 1):
+            for y in range(low_cells[index, 1], high_cells[index, 1] + 1):
+                for z in range(low_cells[index, 2], high_cells[index, 2] + 1):
+                    grid.setdefault((x, y, z), []).append(index)
+
+    candidates = set()
+    for cell in grid.values():
+        for position, first in enumerate(cell):
+            for second in cell[position + 1:]:
+                candidates.add((first, second))
+    pairs = [np.array(sorted(candidates), dtype=np.int64).reshape(-1, 2)]
+
+    # The large boxes against all the others, without building the pairs one by one
+    others = np.arange(len(meshes))
+    for first in large:
+        seconds = others[(others != first) & ~(np.isin(others, large) & (others < first))]
+        pairs.append(np.stack([np.full(len(seconds), first), seconds], axis=1))
+    pairs = np.concatenate(pairs)
+
+    if not len(pairs):
+        return []
+
+    # Vectorized shared volume of all the candidate pairs
+    shared = np.clip(np.minimum(maximums[pairs[:, 0]], maximums[pairs[:, 1]]) -
+                     np.maximum(minimums[pairs[:, 0]], minimums[pairs[:, 1]]), 0, None)
+    volumes = np.prod(np.maximum(extents, QUANTIZE), axis=1)
+    ratios = np.prod(shared, axis=1) / np.maximum(volumes[pairs[:, 0]], volumes[pairs[:, 1]])
+
+    return [(meshes[first], meshes[second]) for first, second in pairs[ratios > OVERLAP_RATIO]]
+
+
+def duplicate_nodes(groups):
+    """
+    The duplicate shapes, with their transform when it holds nothing else: deleting a transform
+    would also delete its child transforms and any other geometry under it
+
+    Args:
+        groups (list): Lists of mesh names from duplicate_groups(), the first one is kept
+
+    Returns:
+        list: Long names of the nodes to delete
+    """
+    shapes = set(mesh for group in groups for mesh in group[1:])
+    nodes = set(shapes)
+    for transform in set(mesh_data.transform_name(shape) for shape in shapes):
+        children = cmds.ls(cmds.listRelatives(transform, children=True, fullPath=True) or [], noIntermediate=True, long=True)
+        if not set(children) - shapes:
+            nodes.add(transform)
+    return sorted(nodes)
+
+
+def check_report(meshes, data, groups):
+    """
+    Builds the report of the duplicated meshes and of the overlaps left between the remaining meshes
+
+    Args:
+        meshes (list): Mesh shapes' long names
+        data (list): The meshes' data, as returned by mesh_data.extract_meshes()
+        groups (list): Groups of identical meshes, the first mesh of a group is the one kept
+
+    Returns:
+        str: 'failed' when there are duplicates, 'warning' when there are only overlaps, else 'passed'
+        dict: Report of duplicate and overlapping object names
+    """
+    status_flag = 'passed'
+    duplicates_report = {}
+
+    duplicates = set(mesh for group in groups for mesh in group[1:])
+    overlaps = [pair for pair in overlap_pairs(meshes, data) if not duplicates.intersection(pair)]
+
+    for group in groups:
+        status_flag = 'failed'
+        kept = mesh_data.transform_name(group[0])
+
+        # Filling the list report
+        duplicates_report[kept] = [["<b style='color:rgb(255,0,0);'>Duplicate Meshes failed:</b> " + 'Object ' + str(kept.rsplit('|', 1)[-1]) + ' is duplicated by: ' + ', '.join(mesh_data.transform_name(mesh).rsplit('|', 1)[-1] for mesh in group[1:])]]
+
+    for first, second in overlaps:
+        if status_flag == 'passed':
+            status_flag = 'warning'
+        first, second = mesh_data.transform_name(first), mesh_data.transform_name(second)
+        duplicates_report.setdefault(first, [[]])[0].append("<b style='color:rgb(255,165,0);'>Duplicate Meshes warning:</b> " + 'Object ' + str(first.rsplit('|', 1)[-1]) + ' overlaps ' + str(second.rsplit('|', 1)[-1]))
+
+    return status_flag, duplicates_report
+
+
+@qc_profiler.profile
+def duplicate_meshes(button_clicked):
+    """
+    Main function called from the UI to check for duplicate and overlapping meshes
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of duplicate and overlapping object names when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    duplicates_report = {}
+
+    meshes = mesh_data.list_meshes()
+    data = mesh_data.extract_meshes(meshes, space=om.MSpace.kWorld)
+    groups = duplicate_groups(meshes, data)
+
+    # Running the check
+    if button_clicked == 'run_button':
+        status_flag, duplicates_report = check_report(meshes, data, groups)
+
+    # Running the fix: deleting all the duplicates in one delete, overlaps are left to the modeler
+    elif button_clicked == 'fix_button':
+        duplicates = duplicate_nodes(groups)
+        if duplicates:
+            cmds.undoInfo(openChunk=True, chunkName='duplicate_meshes')
+            try:
+                cmds.delete(duplicates)
+            finally:
+                cmds.undoInfo(closeChunk=True)
+
+        # Running the check again: the overlaps are still in the scene and are reported as warnings
+        meshes = mesh_data.list_meshes()
+        data = mesh_data.extract_meshes(meshes, space=om.MSpace.kWorld)
+        status_flag, duplicates_report = check_report(meshes, data, duplicate_groups(meshes, data))
+        if status_flag != 'passed':
+            button_switch = 1
+
+    return (status_flag,
+            duplicates_report,
+            button_switch
+            )
@@ -0,0 +1,212 @@
+# **************************************************************************************************************
+# content       = checks the meshes normals: locked normals, inconsistent face winding, unexpected hard edges
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+from checks.modeling import mesh_data
+
+# **************************************************************************************************************
+
+# Hard edges between faces closer than this angle (degrees) are unexpected
+HARD_ANGLE = 30.0
+
+# Component names shown per report line
+REPORT_LIMIT = 20
+
+ISSUES = {'locked': ('locked normals', 'vtx'),
+          'reversed': ('faces with inconsistent winding', 'f'),
+          'hard_edges': ('unexpected hard edges', 'vtx')}
+
+
+def edge_adjacency(data):
+    """
+    Building the mesh's edge adjacency once: every manifold edge and the two face-vertices starting it
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes()
+
+    Returns:
+        np.ndarray: (manifold edges, 2) face-vertex indices, one per face of the edge
+        np.ndarray: (manifold edges, 2) low and high vertex of each edge
+    """
+    vertices = data['vertices']
+    next_vertices = vertices[mesh_data.next_corners(data['offsets'])]
+    edges = np.sort(np.stack([vertices, next_vertices], axis=1), axis=1)
+    _, inverse, edge_counts = np.unique(edges, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+
+    # Face-vertices sorted by edge, the manifold edges' two face-vertices are side by side
+    order = np.argsort(inverse, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(edge_counts)[:-1]])[edge_counts == 2]
+    corners = np.stack([order[starts], order[starts + 1]], axis=1)
+
+    return corners, edges[corners[:, 0]]
+
+
+def minority_faces(face_count, face_pairs, flips):
+    """
+    Flood-filling the winding over the face adjacency: a face takes its neighbour's orientation, flipped across
+    the edges walked in the same direction. The faces of each connected piece wound against the majority
+    are the reversed ones.
+
+    Args:
+        face_count (int): Number of faces of the mesh
+        face_pairs (np.ndarray): (manifold edges, 2) faces sharing each edge
+        flips (np.ndarray): bool per manifold edge, True when both faces walk it in the same direction
+
+    Returns:
+        np.ndarray: Indices of the faces wound against the rest of their piece
+    """
+    # Adjacency as CSR arrays, each edge stored from both of its faces
+    sources = np.concatenate([face_pairs[:, 0], face_pairs[:, 1]])
+    order = np.argsort(sources, kind='stable')
+    neighbours = np.concatenate([face_pairs[:, 1], face_pairs[:, 0]])[order].tolist()
+    neighbour_flips = np.concatenate([flips, flips])[order].tolist()
+    starts = np.searchsorted(sources[order], np.arange(face_count + 1)).tolist()
+
+    orientation = [-1] * face_count
+    reversed_faces = []
+    for seed in range(face_count):
+        if orientation[seed] != -1:
+            continue
+        orientation[seed] = 0
+        piece = [seed]
+        queue = deque(piece)
+        while queue:
+            face = queue.popleft()
+            for index in range(starts[face], starts[face + 1]):
+                neighbour = neighbours[index]
+                if orientation[neighbour] == -1:
+                    orientation[neighbour] = orientation[face] ^ neighbour_flips[index]
+                    piece.append(neighbour)
+                    queue.append(neighbour)
+
+        flipped = [face for face in piece if orientation[face]]
+        reversed_faces.extend(flipped if 2 * len(flipped) <= len(piece) else
+                              [face for face in piece if not orientation[face]])
+
+    return np.array(sorted(reversed_faces), dtype=np.int64)
+
+
+def mesh_normals(data):
+    """
+    Computing all the normal issues of one mesh, numpy releases the GIL so meshes run in parallel
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes() with 'normal_ids' and 'locked'
+                     from mesh_data.extract_normals()
+
+    Returns:
+        dict: 'locked' vertex indices, 'reversed' face indices, 'hard_edges' (edges, 2) vertex pairs
+    """
+    vertices = data['vertices']
+    if not len(vertices):
+        return {'locked': [], 'reversed': [], 'hard_edges': np.zeros((0, 2), dtype=np.int64)}
+
+    next_corners = mesh_data.next_corners(data['offsets'])
+    corner_faces = mesh_data.face_ids(data['offsets'])
+    corners, edges = edge_adjacency(data)
+    first, second = corners[:, 0], corners[:, 1]
+
+    # Consistent winding walks a shared edge in opposite directions in its two faces
+    same_direction = vertices[first] == vertices[second]
+    reversed_faces = minority_faces(len(data['counts']), corner_faces[corners], same_direction)
+
+    # Hard when the two faces don't share the normals at both ends of the edge
+    normal_ids = data['normal_ids']
+    second_start = np.where(same_direction, normal_ids[second], normal_ids[next_corners[second]])
+    second_end = np.where(same_direction, normal_ids[next_corners[second]], normal_ids[second])
+    hard = (normal_ids[first] != second_start) | (normal_ids[next_corners[first]] != second_end)
+
+    # Angle between the two faces' normals, from consistently wound faces only
+    face_normals = mesh_data.face_area_vectors(data)
+    face_normals /= np.maximum(np.linalg.norm(face_normals, axis=1), 1e-12)[:, None]
+    cosines = np.einsum('ij,ij->i', face_normals[corner_faces[first]], face_normals[corner_faces[second]])
+    flat = cosines > np.cos(np.radians(HARD_ANGLE))
+
+    return {'locked': np.unique(vertices[data['locked']]),
+            'reversed': reversed_faces,
+            'hard_edges': edges[hard & flat & ~same_direction]}
+
+
+def mesh_issues(meshes):
+    """
+    Extracting the meshes and their normals on the main thread, then computing the normal issues in worker threads
+
+    Args:
+        meshes (list): Mesh shape long names
+
+    Returns:
+        dict: Mesh name as key, dict from mesh_normals() as value
+    """
+    data = mesh_data.extract_meshes(meshes)
+    for mesh, normal_data in mesh_data.extract_normals(meshes, data).items():
+        data[mesh].update(normal_data)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return dict(zip(meshes, executor.map(mesh_normals, [data[mesh] for mesh in meshes])))
+
+
+@qc_profiler.profile
+def normals(button_clicked):
+    """
+    Main function called from the UI to check the meshes normals
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of mesh names and their normal issues when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    normals_report = {}
+
+    issues = mesh_issues(mesh_data.list_meshes())
+
+    # Running the check
+    if button_clicked == 'run_button':
+        for mesh, mesh_issue in sorted(issues.items()):
+            report_list = []
+            name = mesh_data.transform_name(mesh).rsplit('|', 1)[-1]
+            for issue, (label, component) in ISSUES.items():
+                if len(mesh_issue[issue]):
+                    if issue == 'hard_edges':
+                        names = [name + '.' + component + '[' + str(int(low)) + '] - ' + component + '[' + str(int(high)) + ']' for low, high in mesh_issue[issue][:REPORT_LIMIT]]
+                    else:
+                        names = [name + '.' + component + '[' + str(int(value)) + ']' for value in mesh_issue[issue][:REPORT_LIMIT]]
+                    report_list.append("<b style='color:rgb(255,0,0);'>Normals failed:</b> " + 'Object ' + str(name) + ' has ' + str(len(mesh_issue[issue])) + ' ' + label + ': ' + ', '.join(names) + (' ...' if len(mesh_issue[issue]) > REPORT_LIMIT else ''))
+
+            if report_list:
+                status_flag = 'failed'
+                normals_report[mesh] = [report_list]
+
+    # Running the fix: one unlock, one conform and one soften per mesh
+    elif button_clicked == 'fix_button':
+        cmds.undoInfo(openChunk=True, chunkName='normals')
+        try:
+            for mesh, mesh_issue in issues.items():
+                if len(mesh_issue['locked']):
+                    cmds.polyNormalPerVertex(mesh, unFreezeNormal=True)
+                if len(mesh_issue['reversed']):
+                    cmds.polyNormal(mesh, normalMode=2, userNormalMode=0)
+                if len(mesh_issue['hard_edges']):
+                    cmds.polySoftEdge([mesh + '.e[' + str(index) + ']' for index in mesh_data.edge_indices(mesh, mesh_issue['hard_edges'])], angle=180)
+        finally:
+            cmds.undoInfo(closeChunk=True)
+
+    return (status_flag,
+            normals_report,
+            button_switch
+            )
@@ -8,9 +8,12 @@
 
 import maya.cmds as cmds
 
+from scripts import qc_profiler
+
 # **************************************************************************************************************
 
 
+@qc_profiler.profile
 def illegal_cleanup(button_clicked):
     """
     Main function called from the UI to check for illegal objects
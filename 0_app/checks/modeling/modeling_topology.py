@@ -0,0 +1,240 @@
+# **************************************************************************************************************
+# content       = checks the meshes topology: zero-area faces, n-gons, lamina faces, non-manifold edges, unused vertices
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+from checks.modeling import mesh_data
+
+# **************************************************************************************************************
+
+AREA_TOLERANCE = 1e-8
+# Vertices closer than this are merged by the fix, collapsing the zero-area faces they belong to
+MERGE_DISTANCE = 1e-4
+MAX_SIDES = 4
+
+# Component names shown per report line
+REPORT_LIMIT = 20
+
+ISSUES = {'zero_area': ('zero-area faces', 'f'),
+          'ngons': ('n-gons', 'f'),
+          'lamina': ('lamina faces', 'f'),
+          'non_manifold': ('non-manifold edges', 'e'),
+          'unused': ('unused vertices', 'vtx')}
+
+
+def face_areas(data):
+    """
+    Vectorized area of every face: half the norm of the sum of its corners' cross products
+    around the face's first vertex (a triangle fan, exact for planar faces).
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes()
+
+    Returns:
+        np.ndarray: Area per face
+    """
+    return 0.5 * np.linalg.norm(mesh_data.face_area_vectors(data), axis=1)
+
+
+def lamina_faces(data):
+    """
+    Finding the faces sharing all their vertices with another face. The faces are hashed on
+    their sorted vertices (count, sum, sum of squares, min), only the colliding faces are compared.
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes()
+
+    Returns:
+        list: Groups (lists) of face indices sharing the same vertices
+    """
+    offsets, vertices, counts = data['offsets'], data['vertices'], data['counts']
+    faces = mesh_data.face_ids(offsets)
+    sorted_vertices = vertices[np.lexsort((vertices, faces))]
+
+    keys = np.stack([counts,
+                     np.add.reduceat(sorted_vertices, offsets[:-1]),
+                     np.add.reduceat(sorted_vertices * sorted_vertices, offsets[:-1]),
+                     sorted_vertices[offsets[:-1]]], axis=1)
+    _, inverse, key_counts = np.unique(keys, axis=0, return_inverse=True, return_counts=True)
+    inverse = inverse.reshape(-1)
+
+    groups = {}
+    for face in np.nonzero(key_counts[inverse] > 1)[0]:
+        face_vertices = tuple(sorted_vertices[offsets[face]:offsets[face + 1]])
+        groups.setdefault(face_vertices, []).append(int(face))
+
+    return [group for group in groups.values() if len(group) > 1]
+
+
+def mesh_topology(data):
+    """
+    Computing all the topology issues of one mesh, numpy releases the GIL so meshes run in parallel
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes()
+
+    Returns:
+        dict: 'zero_area', 'ngons', 'unused' indices, 'lamina' face groups and 'non_manifold' (edges, 2) vertex pairs
+    """
+    offsets, vertices = data['offsets'], data['vertices']
+    if not len(vertices):
+        return {'zero_area': [], 'ngons': [], 'lamina': [], 'non_manifold': [],
+                'unused': np.arange(len(data['points']))}
+
+    # Edges as (low, high) vertex pairs, an edge used by more than two faces is non-manifold
+    next_vertices = vertices[mesh_data.next_corners(offsets)]
+    edges = np.sort(np.stack([vertices, next_vertices], axis=1), axis=1)
+    unique_edges, edge_counts = np.unique(edges, axis=0, return_counts=True)
+
+    return {'zero_area': np.nonzero(face_areas(data) <= AREA_TOLERANCE)[0],
+            'ngons': np.nonzero(data['counts'] > MAX_SIDES)[0],
+            'lamina': lamina_faces(data),
+            'non_manifold': unique_edges[edge_counts > 2],
+            'unused': np.nonzero(np.bincount(vertices, minlength=len(data['points'])) == 0)[0]}
+
+
+def mesh_issues(meshes):
+    """
+    Extracting the meshes on the main thread, then computing their topology in worker threads
+
+    Args:
+        meshes (list): Mesh shape long names
+
+    Returns:
+        dict: Mesh name as key, dict from mesh_topology() as value
+    """
+    data = mesh_data.extract_meshes(meshes)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return dict(zip(meshes, executor.map(mesh_topology, [data[mesh] for mesh in meshes])))
+
+
+def degenerate_vertices(data, faces):
+    """
+    Splitting the zero-area faces into the ones that collapse when their coincident vertices are merged
+    (two distinct positions or less) and the slivers (collinear vertices), which are left to the modeler
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_meshes()
+        faces (np.ndarray): Zero-area face indices
+
+    Returns:
+        list: Vertex indices to merge
+        list: Sliver face indices
+    """
+    offsets, vertices = data['offsets'], data['vertices']
+    merge, slivers = set(), []
+    for face in faces:
+        face_vertices = vertices[offsets[face]:offsets[face + 1]]
+        positions = np.round(data['points'][face_vertices] / MERGE_DISTANCE)
+        if len(np.unique(positions, axis=0)) <= 2:
+            merge.update(face_vertices.tolist())
+        else:
+            slivers.append(int(face))
+    return sorted(merge), slivers
+
+
+def components(mesh, issue, values):
+    """
+    Returns:
+        list: Component names of an issue, i.e.: 'pCube1.f[3]'
+    """
+    if issue == 'lamina':
+        values = [face for group in values for face in group]
+    elif issue == 'non_manifold':
+        values = sorted(mesh_data.edge_indices(mesh, values)) if len(values) else []
+    return [mesh + '.' + ISSUES[issue][1] + '[' + str(int(value)) + ']' for value in values]
+
+
+def issues_report(issues):
+    """
+    Args:
+        issues (dict): From mesh_issues()
+
+    Returns:
+        dict: Mesh name as key, list of the report lines list as value, for the meshes with issues
+    """
+    topology_report = {}
+    for mesh, mesh_issue in sorted(issues.items()):
+        report_list = []
+        for issue, (label, _) in ISSUES.items():
+            if len(mesh_issue[issue]):
+                names = [name.rsplit('|', 1)[-1] for name in components(mesh, issue, mesh_issue[issue])]
+                report_list.append("<b style='color:rgb(255,0,0);'>Topology failed:</b> " + 'Object ' + str(mesh_data.transform_name(mesh).rsplit('|', 1)[-1]) + ' has ' + str(len(mesh_issue[issue])) + ' ' + label + ': ' + ', '.join(names[:REPORT_LIMIT]) + (' ...' if len(names) > REPORT_LIMIT else ''))
+
+        if report_list:
+            topology_report[mesh] = [report_list]
+
+    return topology_report
+
+
+@qc_profiler.profile
+def topology(button_clicked):
+    """
+    Main function called from the UI to check the meshes topology
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of mesh names and their topology issues when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    topology_report = {}
+
+    issues = mesh_issues(mesh_data.list_meshes())
+
+    # Running the check
+    if button_clicked == 'run_button':
+        topology_report = issues_report(issues)
+
+    # Running the fix: deleting the extra lamina faces in one delete, then collapsing the zero-area faces
+    # by merging their coincident vertices, deleting them would leave holes
+    elif button_clicked == 'fix_button':
+        lamina = []
+        for mesh, mesh_issue in issues.items():
+            lamina += components(mesh, 'lamina', [group[1:] for group in mesh_issue['lamina']])
+
+        degenerate_meshes = [mesh for mesh, mesh_issue in issues.items() if len(mesh_issue['zero_area'])]
+        data = mesh_data.extract_meshes(degenerate_meshes)
+        merges = {}
+        for mesh in degenerate_meshes:
+            vertices, _ = degenerate_vertices(data[mesh], issues[mesh]['zero_area'])
+            if vertices:
+                merges[mesh] = [mesh + '.vtx[' + str(vertex) + ']' for vertex in vertices]
+
+        if lamina or merges:
+            cmds.undoInfo(openChunk=True, chunkName='topology')
+            try:
+                # The lamina faces share all their vertices with the kept face: no vertex is renumbered
+                if lamina:
+                    cmds.delete(sorted(set(lamina)))
+                for vertices in merges.values():
+                    cmds.polyMergeVertex(vertices, distance=MERGE_DISTANCE)
+            finally:
+                cmds.undoInfo(closeChunk=True)
+
+        # Slivers, n-gons, non-manifold edges and unused vertices are left to the modeler:
+        # the meshes are checked again and what remains stays in the report
+        topology_report = issues_report(mesh_issues(mesh_data.list_meshes()))
+        if topology_report:
+            button_switch = 1
+
+    if topology_report:
+        status_flag = 'failed'
+
+    return (status_flag,
+            topology_report,
+            button_switch
+            )
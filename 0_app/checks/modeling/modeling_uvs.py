@@ -0,0 +1,245 @@
+# **************************************************************************************************************
+# content       = checks the meshes UVs: unmapped faces, faces outside the allowed UDIMs, zero-area UV faces, overlapping shells
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts import qc_profiler
+from checks.modeling import mesh_data
+
+# **************************************************************************************************************
+
+# UDIM tiles the faces can be in, [1001] is the 0-1 range
+ALLOWED_UDIMS = [1001]
+TILE_TOLERANCE = 1e-4
+AREA_TOLERANCE = 1e-10
+# Overlap grid cells per UV unit, two shells covering the same cell overlap
+GRID_RESOLUTION = 512
+MAX_TRIANGLE_CELLS = 1 << 20
+
+# Component names shown per report line
+REPORT_LIMIT = 20
+
+ISSUES = {'unmapped': 'unmapped faces',
+          'out_of_range': 'faces outside the UDIMs ' + ', '.join(str(udim) for udim in ALLOWED_UDIMS),
+          'zero_area': 'zero-area UV faces'}
+
+
+def shell_candidates(minimums, maximums):
+    """
+    Sweep-line over the shells' bounding boxes sorted on U: only the shells whose boxes overlap
+    on both U and V are candidates.
+
+    Args:
+        minimums (np.ndarray): (shells, 2) UV minimums of each shell
+        maximums (np.ndarray): (shells, 2) UV maximums of each shell
+
+    Returns:
+        set: (shell, shell) candidate pairs, lower index first
+    """
+    candidates = set()
+    active = []
+    for shell in np.argsort(minimums[:, 0], kind='stable'):
+        active = [other for other in active if maximums[other, 0] >= minimums[shell, 0]]
+        for other in active:
+            if minimums[shell, 1] <= maximums[other, 1] and minimums[other, 1] <= maximums[shell, 1]:
+                candidates.add((min(other, shell), max(other, shell)))
+        active.append(shell)
+    return candidates
+
+
+def rasterize(corners, triangles):
+    """
+    Vectorized rasterization of UV triangles: the grid cells whose center is inside each triangle
+
+    Args:
+        corners (np.ndarray): (corners, 2) UV of each face-UV
+        triangles (np.ndarray): (triangles, 3) corner indices of each triangle
+
+    Returns:
+        np.ndarray: Triangle index of each covered cell
+        np.ndarray: (covered cells, 2) cell coordinates
+    """
+    a, b, c = corners[triangles[:, 0]], corners[triangles[:, 1]], corners[triangles[:, 2]]
+    low = np.ceil(np.minimum(np.minimum(a, b), c) * GRID_RESOLUTION - 0.5).astype(np.int64)
+    high = np.floor(np.maximum(np.maximum(a, b), c) * GRID_RESOLUTION - 0.5).astype(np.int64)
+    widths = np.clip(high[:, 0] - low[:, 0] + 1, 0, None)
+    cell_counts = widths * np.clip(high[:, 1] - low[:, 1] + 1, 0, None)
+    # Huge triangles are already outside the UDIMs, they would only cost memory here
+    cell_counts[cell_counts > MAX_TRIANGLE_CELLS] = 0
+
+    # Every cell of every triangle's bounding box, then the ones inside the triangle
+    cell_triangles = np.repeat(np.arange(len(triangles)), cell_counts)
+    local = np.arange(cell_counts.sum()) - np.repeat(np.cumsum(cell_counts) - cell_counts, cell_counts)
+    cells = low[cell_triangles] + np.stack([local % np.maximum(widths[cell_triangles], 1),
+                                            local // np.maximum(widths[cell_triangles], 1)], axis=1)
+    centers = (cells + 0.5) / GRID_RESOLUTION
+
+    edges = []
+    for start, end in ((a, b), (b, c), (c, a)):
+        start, end = start[cell_triangles], end[cell_triangles]
+        edges.append((centers[:, 0] - start[:, 0]) * (end[:, 1] - start[:, 1]) -
+                     (centers[:, 1] - start[:, 1]) * (end[:, 0] - start[:, 0]))
+    edges = np.stack(edges, axis=1)
+    inside = np.all(edges >= 0, axis=1) | np.all(edges <= 0, axis=1)
+
+    return cell_triangles[inside], cells[inside]
+
+
+def overlapping_shells(data, mapped, face_shells):
+    """
+    Sweep-line over the shells' bounding boxes to find the candidate shells, then rasterizing
+    the candidates' faces in a uniform grid: two shells covering the same cell overlap.
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_uvs()
+        mapped (np.ndarray): Indices of the faces with UVs
+        face_shells (np.ndarray): (mapped faces) shell of each mapped face
+
+    Returns:
+        list: (shell, shell) overlapping pairs
+    """
+    uvs, offsets, uv_ids = data['uvs'], data['offsets'], data['uv_ids']
+    used = np.nonzero(np.bincount(uv_ids, minlength=len(uvs)))[0]
+    shells = data['shells'][used]
+    shell_count = int(shells.max()) + 1
+    minimums = np.full((shell_count, 2), np.inf)
+    maximums = np.full((shell_count, 2), -np.inf)
+    np.minimum.at(minimums, shells, uvs[used])
+    np.maximum.at(maximums, shells, uvs[used])
+
+    candidates = shell_candidates(minimums, maximums)
+    if not candidates:
+        return []
+
+    # Fan triangles (first corner, corner, next corner) of the candidate shells' faces
+    faces = mapped[np.isin(face_shells, np.array(sorted(set(shell for pair in candidates for shell in pair))))]
+    corner_faces = mesh_data.face_ids(offsets)
+    next_corners = mesh_data.next_corners(offsets)
+    fan = np.nonzero(np.isin(corner_faces, faces))[0]
+    fan = fan[(fan != offsets[corner_faces[fan]]) & (next_corners[fan] != offsets[corner_faces[fan]])]
+    triangles = np.stack([offsets[corner_faces[fan]], fan, next_corners[fan]], axis=1)
+    if not len(triangles):
+        return []
+
+    cell_triangles, cells = rasterize(uvs[uv_ids], triangles)
+    triangle_shells = data['shells'][uv_ids[triangles[:, 0]]]
+    rows = np.unique(np.column_stack([cells, triangle_shells[cell_triangles]]), axis=0)
+
+    # Rows are sorted per cell: consecutive rows of the same cell hold different shells
+    same_cell = np.all(rows[1:, :2] == rows[:-1, :2], axis=1)
+    pairs = set(zip(rows[:-1, 2][same_cell].tolist(), rows[1:, 2][same_cell].tolist()))
+    return sorted(pair for pair in pairs if pair in candidates)
+
+
+def mesh_uvs(data):
+    """
+    Computing all the UV issues of one mesh, numpy releases the GIL so meshes run in parallel
+
+    Args:
+        data (dict): One mesh from mesh_data.extract_uvs()
+
+    Returns:
+        dict: 'unmapped', 'out_of_range', 'zero_area' face indices, 'overlaps' (shell, shell) pairs
+              and 'shell_faces' one face per shell for the report
+    """
+    counts, offsets, uv_ids = data['counts'], data['offsets'], data['uv_ids']
+    mapped = np.nonzero(counts > 0)[0]
+    issues = {'unmapped': np.nonzero(counts == 0)[0], 'out_of_range': [], 'zero_area': [],
+              'overlaps': [], 'shell_faces': {}}
+    if not len(mapped):
+        return issues
+
+    corners = data['uvs'][uv_ids]
+    next_corners = data['uvs'][uv_ids[mesh_data.next_corners(offsets)]]
+    starts = offsets[:-1][mapped]
+    corner_faces = mesh_data.face_ids(offsets)
+
+    # UDIM tile of each face from its center, the face's corners have to stay in that tile
+    centers = np.zeros((len(counts), 2))
+    centers[mapped] = np.add.reduceat(corners, starts, axis=0) / counts[mapped][:, None]
+    tiles = np.floor(centers)
+    outside = np.any((corners < tiles[corner_faces] - TILE_TOLERANCE) |
+                     (corners > tiles[corner_faces] + 1 + TILE_TOLERANCE), axis=1)
+    udims = 1001 + tiles[:, 0] + 10 * tiles[:, 1]
+    out_of_range = (tiles[:, 0] < 0) | (tiles[:, 0] > 9) | (tiles[:, 1] < 0) | ~np.isin(udims, ALLOWED_UDIMS)
+    out_of_range |= np.bincount(corner_faces[outside], minlength=len(counts)) > 0
+    issues['out_of_range'] = mapped[out_of_range[mapped]]
+
+    # Shoelace area of each face
+    cross = corners[:, 0] * next_corners[:, 1] - next_corners[:, 0] * corners[:, 1]
+    areas = 0.5 * np.abs(np.add.reduceat(cross, starts))
+    issues['zero_area'] = mapped[areas <= AREA_TOLERANCE]
+
+    # Shell of each face from its first UV
+    face_shells = data['shells'][uv_ids[starts]]
+    issues['overlaps'] = overlapping_shells(data, mapped, face_shells)
+    if issues['overlaps']:
+        first_faces = np.unique(face_shells, return_index=True)
+        issues['shell_faces'] = dict(zip(first_faces[0].tolist(), mapped[first_faces[1]].tolist()))
+
+    return issues
+
+
+def mesh_issues(meshes):
+    """
+    Extracting the UVs on the main thread, then computing the UV issues in worker threads
+
+    Args:
+        meshes (list): Mesh shape long names
+
+    Returns:
+        dict: Mesh name as key, dict from mesh_uvs() as value
+    """
+    data = mesh_data.extract_uvs(meshes)
+    with ThreadPoolExecutor(max_workers=os.cpu_count()) as executor:
+        return dict(zip(meshes, executor.map(mesh_uvs, [data[mesh] for mesh in meshes])))
+
+
+@qc_profiler.profile
+def uv_layout(button_clicked):
+    """
+    Main function called from the UI to check the meshes UVs
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of mesh names and their UV issues when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    uvs_report = {}
+
+    issues = mesh_issues(mesh_data.list_meshes())
+
+    for mesh, mesh_issue in sorted(issues.items()):
+        report_list = []
+        name = mesh_data.transform_name(mesh).rsplit('|', 1)[-1]
+        for issue, label in ISSUES.items():
+            if len(mesh_issue[issue]):
+                faces = [name + '.f[' + str(int(face)) + ']' for face in mesh_issue[issue][:REPORT_LIMIT]]
+                report_list.append("<b style='color:rgb(255,0,0);'>UV Layout failed:</b> " + 'Object ' + str(name) + ' has ' + str(len(mesh_issue[issue])) + ' ' + label + ': ' + ', '.join(faces) + (' ...' if len(mesh_issue[issue]) > REPORT_LIMIT else ''))
+        for first, second in mesh_issue['overlaps']:
+            report_list.append("<b style='color:rgb(255,0,0);'>UV Layout failed:</b> " + 'Object ' + str(name) + ' has overlapping UV shells at ' + name + '.f[' + str(mesh_issue['shell_faces'][first]) + '] and ' + name + '.f[' + str(mesh_issue['shell_faces'][second]) + ']')
+
+        if report_list:
+            status_flag = 'failed'
+            uvs_report[mesh] = [report_list]
+
+    # UV layouts are a modeler's choice: no automatic fix, the report stays
+    if button_clicked == 'fix_button':
+        button_switch = 1
+
+    return (status_flag,
+            uvs_report,
+            button_switch
+            )
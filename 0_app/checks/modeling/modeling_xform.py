@@ -8,9 +8,12 @@
 
 import maya.cmds as cmds
 
+from scripts import qc_profiler
+
 # **************************************************************************************************************
 
 
+@qc_profiler.profile
 def meshes_xform(button_clicked):
     """
     Main function called from the UI to check for objects with rotation or scale values
@@ -44,11 +47,11 @@ def meshes_xform(button_clicked):
     # Running the check
     if button_clicked == 'run_button':
         xform_report = {}
-        report_list = []
 
         # Check if rotation or scale are not zeroed out
         for asset_mesh in polygon_meshes:
             transform = cmds.listRelatives(asset_mesh, parent=True)[0]
+            report_list = []
 
             # Assigning rotation x, y z
             asset_rotx = cmds.getAttr(transform + '.rotateX')
@@ -110,11 +113,11 @@ def meshes_xform(button_clicked):
 
             if failed_attributes:
                 xform_report = {}
-                report_list = []
 
                 # Check if rotation or scale are not zeroed out
                 for asset_mesh in polygon_meshes:
                     transform = cmds.listRelatives(asset_mesh, parent=True)[0]
+                    report_list = []
 
                     # Assigning rotation x, y z
                     asset_rotx = cmds.getAttr(transform + '.rotateX')
@@ -0,0 +1,180 @@
+# **************************************************************************************************************
+# content       = checks and applies the rig's controllers colors from the 'control_colors.yml' rules
+#
+# dependencies  = Maya
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import re
+import yaml
+import fnmatch
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+
+# **************************************************************************************************************
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'data', 'project', 'control_colors.yml'))
+
+
+def load_rules(rules_path=RULES_PATH):
+    """
+    Loading and compiling the color rules
+
+    Args:
+        rules_path (str): Path of the yaml rules file
+
+    Returns:
+        re.Pattern: Matches the controller names
+        list: (re.Pattern, int | tuple) pairs, the first matching pattern gives the color
+    """
+    with open(rules_path, 'r') as stream:
+        rules = yaml.load(stream, Loader=yaml.FullLoader)
+
+    controller_regex = re.compile('|'.join(fnmatch.translate(pattern) for pattern in rules['Controllers']))
+    color_rules = []
+    for rule in rules['Rules']:
+        color = rule['color']
+        color_rules.append((re.compile(fnmatch.translate(rule['pattern'])),
+                            tuple(color) if isinstance(color, list) else color))
+
+    return controller_regex, color_rules
+
+
+def list_controller_shapes(controller_regex):
+    """
+    Listing every controller's curve shapes with a single 'ls' query.
+    Parents are read from the long names instead of one 'listRelatives' per shape.
+
+    Args:
+        controller_regex (re.Pattern): Matches the controller names
+
+    Returns:
+        dict: Controller short name as key, list of its curve shapes (long names) as value
+    """
+    controller_shapes = {}
+    for shape in cmds.ls(type='nurbsCurve', long=True, noIntermediate=True) or []:
+        controller = shape.rsplit('|', 1)[0].rsplit('|', 1)[-1]
+        if controller_regex.match(controller.rsplit(':', 1)[-1]):
+            controller_shapes.setdefault(controller, []).append(shape)
+
+    return controller_shapes
+
+
+def resolve_colors(controller_shapes, color_rules):
+    """
+    Giving each controller the color of the first rule matching its name
+
+    Args:
+        controller_shapes (dict): From list_controller_shapes()
+        color_rules (list): From load_rules()
+
+    Returns:
+        dict: Controller name as key, palette index (int) or RGB (tuple) as value
+    """
+    controller_colors = {}
+    for controller in controller_shapes:
+        for regex, color in color_rules:
+            if regex.match(controller.rsplit(':', 1)[-1]):
+                controller_colors[controller] = color
+                break
+
+    return controller_colors
+
+
+def shape_color(shape):
+    """
+    Returns the override color of a shape, None if the override is off
+    """
+    if not cmds.getAttr(shape + '.overrideEnabled'):
+        return None
+    if cmds.getAttr(shape + '.overrideRGBColors'):
+        return tuple(round(value, 3) for value in cmds.getAttr(shape + '.overrideColorRGB')[0])
+    return cmds.getAttr(shape + '.overrideColor')
+
+
+@qc_profiler.profile
+def apply_colors(controller_shapes, controller_colors):
+    """
+    Applying the override colors in one undo chunk
+
+    Args:
+        controller_shapes (dict): From list_controller_shapes()
+        controller_colors (dict): From resolve_colors()
+
+    Returns:
+        dict: Skipped controller name as key, reason (str) as value
+    """
+    skipped = {}
+    cmds.undoInfo(openChunk=True, chunkName='control_colors')
+    try:
+        for controller, color in controller_colors.items():
+            for shape in controller_shapes[controller]:
+                try:
+                    cmds.setAttr(shape + '.overrideEnabled', 1)
+                    if isinstance(color, tuple):
+                        cmds.setAttr(shape + '.overrideRGBColors', 1)
+                        cmds.setAttr(shape + '.overrideColorRGB', *color)
+                    else:
+                        cmds.setAttr(shape + '.overrideRGBColors', 0)
+                        cmds.setAttr(shape + '.overrideColor', color)
+                except RuntimeError as error:
+                    # Locked or connected override attributes
+                    skipped[controller] = str(error).strip()
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    return skipped
+
+
+@qc_profiler.profile
+def control_colors(button_clicked):
+    """
+    Main function called from the UI to check the controllers colors against the rules
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of controller names and their colors when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    colors_report = {}
+
+    controller_regex, color_rules = load_rules()
+    controller_shapes = list_controller_shapes(controller_regex)
+    controller_colors = resolve_colors(controller_shapes, color_rules)
+
+    # Running the check
+    if button_clicked == 'run_button':
+        for controller, color in sorted(controller_colors.items()):
+            for shape in controller_shapes[controller]:
+                current_color = shape_color(shape)
+                if current_color != color:
+                    status_flag = 'failed'
+
+                    # Filling the list report
+                    colors_report[controller] = [["<b style='color:rgb(255,0,0);'>Control Colors failed:</b> " + 'Controller ' + str(controller) + ' color is: ' + str(current_color) + ', expected: ' + str(color)]]
+                    break
+
+    # Running the fix
+    elif button_clicked == 'fix_button':
+        skipped = apply_colors(controller_shapes, controller_colors)
+
+        # Keeping the skipped controllers in the report, they need a manual fix
+        if skipped:
+            status_flag = 'failed'
+            button_switch = 1
+            for controller, reason in sorted(skipped.items()):
+                colors_report[controller] = [["<b style='color:rgb(255,0,0);'>Control Colors skipped:</b> " + 'Controller ' + str(controller) + ': ' + reason]]
+
+    return (status_flag,
+            colors_report,
+            button_switch
+            )
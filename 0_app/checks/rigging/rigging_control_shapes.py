@@ -0,0 +1,176 @@
+# **************************************************************************************************************
+# content       = checks the controllers' shapes against the 'control_shapes.yml' library with CV fingerprints
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import json
+import yaml
+import hashlib
+import numpy as np
+import maya.api.OpenMaya as om
+
+from scripts import qc_profiler
+from checks.rigging import rigging_control_color
+
+# **************************************************************************************************************
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+LIBRARY_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'data', 'project', 'control_shapes.yml'))
+CACHE_PATH = os.path.join(os.path.expanduser('~'), '.qc_cache', 'control_shapes.json')
+
+# Fingerprint resolution on the normalized shape (radius 1)
+QUANTIZE = 100
+# Bumped when fingerprint() changes, the cached library fingerprints are then recomputed
+FINGERPRINT_VERSION = 2
+
+
+def fingerprint(cvs, periodic=False):
+    """
+    Hashing a shape independently of its position, size, orientation, direction and first CV:
+    each CV's distance to the center and the length of its edge to the next CV, normalized and quantized,
+    read from the canonical start (the smallest sequence over both directions and, for periodic curves,
+    every start CV).
+
+    Args:
+        cvs (np.ndarray): (CVs, 3) positions, without the overlapping CVs of periodic curves
+        periodic (bool): The last CV connects back to the first one
+
+    Returns:
+        str: The shape's fingerprint
+    """
+    cvs = cvs - cvs.mean(axis=0)
+    scale = np.linalg.norm(cvs, axis=1).max() or 1.0
+
+    sequences = []
+    for points in (cvs, cvs[::-1]):
+        next_points = np.roll(points, -1, axis=0) if periodic else points[1:]
+        edges = np.round(np.linalg.norm(next_points - points[:len(next_points)], axis=1) / scale * QUANTIZE)
+        if not periodic:
+            edges = np.append(edges, -1)
+        rows = np.stack([np.round(np.linalg.norm(points, axis=1) / scale * QUANTIZE), edges], axis=1)
+        for start in range(len(rows) if periodic else 1):
+            sequences.append(tuple(np.roll(rows, -start, axis=0).ravel().tolist()))
+
+    quantized = np.array([len(cvs), int(periodic)] + list(min(sequences)), dtype=np.int32)
+    return hashlib.sha1(quantized.tobytes()).hexdigest()
+
+
+def library_fingerprints(library_path=LIBRARY_PATH, cache_path=CACHE_PATH):
+    """
+    Returns the library fingerprints, computed once per library modification, QUANTIZE and
+    FINGERPRINT_VERSION and cached on disk
+
+    Returns:
+        dict: Fingerprint as key, reference shape name as value
+    """
+    cache_key = [os.path.getmtime(library_path), QUANTIZE, FINGERPRINT_VERSION]
+    if os.path.exists(cache_path):
+        with open(cache_path, 'r') as stream:
+            cache = json.load(stream)
+        if cache.get('key') == cache_key:
+            return cache['fingerprints']
+
+    with open(library_path, 'r') as stream:
+        library = yaml.load(stream, Loader=yaml.FullLoader)
+    fingerprints = {fingerprint(np.array(shape['cvs'], dtype=np.float64), shape.get('periodic', False)): name
+                    for name, shape in library.items()}
+
+    if not os.path.exists(os.path.dirname(cache_path)):
+        os.makedirs(os.path.dirname(cache_path))
+    with open(cache_path, 'w') as stream:
+        json.dump({'key': cache_key, 'fingerprints': fingerprints}, stream)
+
+    return fingerprints
+
+
+def shape_fingerprints(shapes):
+    """
+    Fingerprinting all the curve shapes from one selection list
+
+    Args:
+        shapes (list): nurbsCurve shape long names
+
+    Returns:
+        dict: Shape name as key, fingerprint as value
+    """
+    selection = om.MSelectionList()
+    for shape in shapes:
+        selection.add(shape)
+
+    fingerprints = {}
+    for index, shape in enumerate(shapes):
+        curve_fn = om.MFnNurbsCurve(selection.getDagPath(index))
+        cvs = np.array([[point.x, point.y, point.z] for point in curve_fn.cvPositions(om.MSpace.kObject)])
+        periodic = curve_fn.form == om.MFnNurbsCurve.kPeriodic
+        if periodic:
+            cvs = cvs[:-curve_fn.degree]
+        fingerprints[shape] = fingerprint(cvs, periodic)
+
+    return fingerprints
+
+
+def mirror_name(controller):
+    """
+    Returns the other side's controller name, None for center controllers
+    """
+    namespace, _, name = controller.rpartition(':')
+    for side, other_side in (('L_', 'R_'), ('R_', 'L_')):
+        if name.startswith(side):
+            return (namespace + ':' if namespace else '') + other_side + name[len(side):]
+    return None
+
+
+@qc_profiler.profile
+def control_shapes(button_clicked):
+    """
+    Main function called from the UI to check the controllers' shapes
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of controller names and their shape issues when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    shapes_report = {}
+
+    library = library_fingerprints()
+    controller_regex, _ = rigging_control_color.load_rules()
+    controller_shapes = rigging_control_color.list_controller_shapes(controller_regex)
+    fingerprints = shape_fingerprints([shape for shapes in controller_shapes.values() for shape in shapes])
+
+    controller_prints = {controller: sorted(fingerprints[shape] for shape in shapes)
+                         for controller, shapes in controller_shapes.items()}
+
+    for controller, prints in sorted(controller_prints.items()):
+        report_list = []
+
+        # Not in the library
+        unknown = [shape for shape in controller_shapes[controller] if fingerprints[shape] not in library]
+        if unknown:
+            report_list.append("<b style='color:rgb(255,0,0);'>Control Shape Consistency failed:</b> " + 'Controller ' + str(controller) + ' has shapes not in the library: ' + ', '.join(shape.rsplit('|', 1)[-1] for shape in unknown))
+
+        # Left and right sides don't match
+        mirror = mirror_name(controller)
+        if mirror in controller_prints and controller_prints[mirror] != prints:
+            report_list.append("<b style='color:rgb(255,0,0);'>Control Shape Consistency failed:</b> " + 'Controller ' + str(controller) + " shape doesn't match " + str(mirror))
+
+        if report_list:
+            status_flag = 'failed'
+            shapes_report[controller] = [report_list]
+
+    # Replacing a shape is a rigger's choice: no automatic fix, the report stays
+    if button_clicked == 'fix_button':
+        button_switch = 1
+
+    return (status_flag,
+            shapes_report,
+            button_switch
+            )
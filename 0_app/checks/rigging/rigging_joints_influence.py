@@ -0,0 +1,164 @@
+# **************************************************************************************************************
+# content       = checks the skinClusters' influences per vertex with their whole weight matrix
+#
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+from scripts import qc_profiler
+from checks.rigging import skin_weights_command
+
+# **************************************************************************************************************
+
+MAX_INFLUENCES = 4
+WEIGHT_THRESHOLD = 0.001
+NORMALIZE_TOLERANCE = 0.001
+
+# Vertices read per getWeights() call, keeps memory bounded on 200k vertices x 300 joints
+CHUNK_SIZE = 20000
+
+
+def skin_data(skin_cluster):
+    """
+    Returns the API objects needed to read and write a skinCluster's weights
+
+    Args:
+        skin_cluster (str): skinCluster name
+
+    Returns:
+        MFnSkinCluster: The skinCluster function set
+        MDagPath: The skinned mesh, None if the skinCluster doesn't deform a mesh
+        int: Number of vertices
+        int: Number of influences
+    """
+    selection = om.MSelectionList()
+    selection.add(skin_cluster)
+    skin_fn = oma.MFnSkinCluster(selection.getDependNode(0))
+
+    geometry = skin_fn.getOutputGeometry()
+    if not geometry or not geometry[0].hasFn(om.MFn.kMesh):
+        return skin_fn, None, 0, 0
+
+    mesh_path = om.MDagPath.getAPathTo(geometry[0])
+    return skin_fn, mesh_path, om.MFnMesh(mesh_path).numVertices, len(skin_fn.influenceObjects())
+
+
+def vertex_component(vertex_ids):
+    component_fn = om.MFnSingleIndexedComponent()
+    component = component_fn.create(om.MFn.kMeshVertComponent)
+    component_fn.addElements(om.MIntArray(vertex_ids))
+    return component
+
+
+def weight_chunks(skin_fn, mesh_path, vertex_count, influence_count):
+    """
+    Yields the weight matrix CHUNK_SIZE vertices at a time
+
+    Yields:
+        np.ndarray: Vertex ids of the chunk
+        np.ndarray: (vertices, influences) weights
+    """
+    for start in range(0, vertex_count, CHUNK_SIZE):
+        vertex_ids = np.arange(start, min(start + CHUNK_SIZE, vertex_count))
+        weights, _ = skin_fn.getWeights(mesh_path, vertex_component(vertex_ids.tolist()))
+        yield vertex_ids, np.array(weights, dtype=np.float64).reshape(len(vertex_ids), influence_count)
+
+
+def analyse_weights(weights):
+    """
+    Vectorized stats of a weight matrix
+
+    Args:
+        weights (np.ndarray): (vertices, influences) weights
+
+    Returns:
+        np.ndarray: bool per vertex, True when it needs pruning or normalizing
+        dict: over_limit, max_influences, near_zero and unnormalized counts
+    """
+    influences = (weights > WEIGHT_THRESHOLD).sum(axis=1)
+    near_zero = (weights > 0) & (weights <= WEIGHT_THRESHOLD)
+    unnormalized = np.abs(weights.sum(axis=1) - 1.0) > NORMALIZE_TOLERANCE
+    over_limit = influences > MAX_INFLUENCES
+
+    stats = {'over_limit': int(over_limit.sum()),
+             'max_influences': int(influences.max()) if len(influences) else 0,
+             'near_zero': int(near_zero.sum()),
+             'unnormalized': int(unnormalized.sum())}
+    return over_limit | near_zero.any(axis=1) | unnormalized, stats
+
+
+def prune_weights(weights):
+    """
+    Keeping the MAX_INFLUENCES biggest weights above WEIGHT_THRESHOLD and normalizing, all rows at once.
+    The biggest weight of each vertex is always kept: a vertex without weights would collapse to the origin.
+    """
+    keep = weights > WEIGHT_THRESHOLD
+    keep[np.arange(len(weights)), np.argmax(weights, axis=1)] = True
+    weights = np.where(keep, weights, 0.0)
+    if weights.shape[1] > MAX_INFLUENCES:
+        smallest = np.argpartition(weights, -MAX_INFLUENCES, axis=1)[:, :-MAX_INFLUENCES]
+        np.put_along_axis(weights, smallest, 0.0, axis=1)
+
+    totals = weights.sum(axis=1, keepdims=True)
+    return np.divide(weights, totals, out=np.zeros_like(weights), where=totals > 0)
+
+
+@qc_profiler.profile
+def joints_influence(button_clicked):
+    """
+    Main function called from the UI to check the skinned meshes' influences per vertex
+
+    Args:
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of mesh names and their influence stats when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    influence_report = {}
+
+    if button_clicked == 'fix_button':
+        cmds.undoInfo(openChunk=True, chunkName='joints_influence')
+    try:
+        for skin_cluster in cmds.ls(type='skinCluster') or []:
+            skin_fn, mesh_path, vertex_count, influence_count = skin_data(skin_cluster)
+            if mesh_path is None:
+                continue
+            mesh = mesh_path.partialPathName()
+
+            total = {'over_limit': 0, 'max_influences': 0, 'near_zero': 0, 'unnormalized': 0}
+
+            for vertex_ids, weights in weight_chunks(skin_fn, mesh_path, vertex_count, influence_count):
+                needs_fix, stats = analyse_weights(weights)
+                total['max_influences'] = max(total['max_influences'], stats.pop('max_influences'))
+                for key, value in stats.items():
+                    total[key] += value
+
+                # Running the fix: each chunk is written in one undoable setWeights() as soon as it is pruned
+                if button_clicked == 'fix_button' and needs_fix.any():
+                    skin_weights_command.set_weights(skin_cluster, vertex_ids[needs_fix], prune_weights(weights[needs_fix]))
+
+            # Running the check
+            if button_clicked == 'run_button':
+                if total['over_limit'] or total['near_zero'] or total['unnormalized']:
+                    status_flag = 'failed'
+
+                    # Filling the list report
+                    influence_report[mesh] = [["<b style='color:rgb(255,0,0);'>Joints Influence Count failed:</b> " + 'Mesh ' + str(mesh) + ' (' + skin_cluster + '): ' + str(total['over_limit']) + ' vertices above ' + str(MAX_INFLUENCES) + ' influences (max ' + str(total['max_influences']) + '), ' + str(total['near_zero']) + ' near-zero weights, ' + str(total['unnormalized']) + ' unnormalized vertices']]
+    finally:
+        if button_clicked == 'fix_button':
+            cmds.undoInfo(closeChunk=True)
+
+    return (status_flag,
+            influence_report,
+            button_switch
+            )
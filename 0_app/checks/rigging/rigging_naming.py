@@ -0,0 +1,279 @@
+# **************************************************************************************************************
+# content       = checks the controllers and joints names against the 'naming_rules.yml' rules
+#
+# dependencies  = Maya
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import re
+import yaml
+import maya.cmds as cmds
+
+from scripts import qc_profiler
+
+# **************************************************************************************************************
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+RULES_PATH = os.path.abspath(os.path.join(script_dir, '..', '..', 'data', 'project', 'naming_rules.yml'))
+
+# Node types reading curves that aren't controllers
+UTILITY_CURVE_READERS = ['ikHandle', 'wire']
+
+# Compiled rules per (department, kind), built once per rules file modification
+_compiled = {}
+
+
+def compile_rule(rule):
+    """
+    Compiling one kind's rule into a multiline regex, so all the names are validated
+    in a single search over the newline joined names.
+
+    Args:
+        rule (dict): sides, suffixes, token and max_tokens of one kind
+
+    Returns:
+        re.Pattern: Matches a whole line holding a valid name
+    """
+    sides = '|'.join(re.escape(side) for side in rule['sides'])
+    suffixes = '|'.join(re.escape(suffix) for suffix in rule['suffixes'])
+    token = f'(?:{rule["token"]})'
+    tokens = f'{token}(?:_{token}){{0,{rule["max_tokens"] - 1}}}'
+    return re.compile(f'^(?:{sides})_{tokens}_(?:{suffixes})$', re.MULTILINE)
+
+
+def load_rules(department, kind, rules_path=RULES_PATH):
+    """
+    Returns the compiled rule and the rename aliases of a department's node kind
+
+    Args:
+        department (str): i.e.: 'Rigging'
+        kind (str): i.e.: 'Controllers' or 'Joints'
+        rules_path (str): Path of the yaml rules file
+
+    Returns:
+        re.Pattern: From compile_rule()
+        dict: The kind's rule
+        dict: Alias -> side and alias -> suffix lookups
+    """
+    key = (department, kind, os.path.getmtime(rules_path))
+    if key not in _compiled:
+        with open(rules_path, 'r') as stream:
+            rules = yaml.load(stream, Loader=yaml.FullLoader)
+
+        rule = rules[department][kind]
+        aliases = {'sides': {}, 'suffixes': {}}
+        for group in aliases:
+            for name, name_aliases in rules['Aliases'][group].items():
+                aliases[group][name] = name
+                for alias in name_aliases:
+                    aliases[group][alias] = name
+
+        _compiled[key] = (compile_rule(rule), rule, aliases)
+
+    return _compiled[key]
+
+
+def list_named_nodes():
+    """
+    Listing the joints and the curve controllers with a single 'ls' query, whatever their current names.
+    Controllers are the transforms with curve shapes that aren't under a joint, nor driving an IK-spline
+    or a wire, plus every node tagged as a controller.
+
+    Returns:
+        dict: 'Joints' and 'Controllers' lists of long names
+    """
+    nodes = {'Joints': [], 'Controllers': set()}
+    curves = []
+    listing = cmds.ls(type=['joint', 'nurbsCurve'], long=True, noIntermediate=True, showType=True) or []
+    for node, node_type in zip(listing[::2], listing[1::2]):
+        if node_type == 'joint':
+            nodes['Joints'].append(node)
+        else:
+            curves.append(node)
+
+    # Curves read by an IK-spline or a wire deformer are rig internals
+    utility_curves = set()
+    for node_type in UTILITY_CURVE_READERS:
+        connections = (cmds.listConnections(curves, source=False, destination=True, connections=True,
+                                            type=node_type) or []) if curves else []
+        utility_curves.update(plug.split('.', 1)[0] for plug in connections[::2])
+    utility_curves = set(cmds.ls(list(utility_curves), long=True) or []) if utility_curves else set()
+
+    joint_paths = tuple(joint + '|' for joint in nodes['Joints'])
+    for curve in curves:
+        controller = curve.rsplit('|', 1)[0]
+        if curve not in utility_curves and not controller.startswith(joint_paths):
+            nodes['Controllers'].add(controller)
+
+    # Tagged controllers count even under a joint
+    tags = cmds.ls(type='controller') or []
+    tagged = (cmds.listConnections([tag + '.controllerObject' for tag in tags], source=True, destination=False) or []) if tags else []
+    nodes['Controllers'].update((cmds.ls(tagged, long=True) or []) if tagged else [])
+
+    nodes['Controllers'] = sorted(nodes['Controllers'])
+    return nodes
+
+
+def short_name(node):
+    """
+    Returns the name without its path and namespace
+    """
+    return node.rsplit('|', 1)[-1].rsplit(':', 1)[-1]
+
+
+def invalid_names(names, regex):
+    """
+    Args:
+        names (list): Short names
+        regex (re.Pattern): From compile_rule()
+
+    Returns:
+        set: The names not matching the rule
+    """
+    valid = set(regex.findall('\n'.join(names)))
+    return set(names) - valid
+
+
+def suggest_names(names, rule, aliases):
+    """
+    Suggesting a valid name for each invalid one, from its side and suffix aliases and its tokens
+
+    Args:
+        names (set): Invalid short names
+        rule (dict): The kind's rule
+        aliases (dict): From load_rules()
+
+    Returns:
+        dict: Invalid name as key, suggested name as value, None when the name has more than
+              'max_tokens' tokens: merging them would lose information, it needs a manual rename
+    """
+    suggestions = {}
+    for name in names:
+        # Splitting on '_' and camelCase boundaries
+        tokens = [token for part in name.split('_')
+                  for token in re.findall(r'[A-Z]+(?![a-z])|[A-Z]?[a-z]+|[0-9]+', part)]
+
+        side = rule['sides'][0]
+        if tokens and aliases['sides'].get(tokens[0]) in rule['sides']:
+            side = aliases['sides'][tokens.pop(0)]
+
+        suffix = rule['suffixes'][0]
+        if tokens and aliases['suffixes'].get(tokens[-1]) in rule['suffixes']:
+            suffix = aliases['suffixes'][tokens.pop()]
+
+        if len(tokens) > rule['max_tokens']:
+            suggestions[name] = None
+            continue
+
+        tokens = tokens or ['node']
+        body = tokens[0].lower() + ''.join(token.capitalize() for token in tokens[1:])
+        suggestions[name] = f'{side}_{body}_{suffix}'
+
+    return suggestions
+
+
+def rename_nodes(nodes, suggestions):
+    """
+    Renaming in one undo chunk, deepest nodes first so the parents' long names stay valid.
+    Referenced and locked nodes can't be renamed, they are skipped. Maya adds a number to a name
+    clashing with a sibling's, the name it gives back is reported.
+
+    Args:
+        nodes (list): Long names of the nodes to rename
+        suggestions (dict): From suggest_names()
+
+    Returns:
+        dict: Skipped or renamed with a clash node long name as key, reason (str) as value
+    """
+    skipped = {}
+    cmds.undoInfo(openChunk=True, chunkName='naming')
+    try:
+        for node in sorted(nodes, key=lambda node: node.count('|'), reverse=True):
+            if cmds.referenceQuery(node, isNodeReferenced=True):
+                skipped[node] = 'referenced node'
+            elif cmds.lockNode(node, query=True, lock=True)[0]:
+                skipped[node] = 'locked node'
+            else:
+                suggestion = suggestions[short_name(node)]
+                new_name = cmds.rename(node, suggestion)
+                if short_name(new_name) != suggestion:
+                    skipped[node.rsplit('|', 1)[0] + '|' + short_name(new_name)] = 'renamed ' + short_name(new_name) + ', ' + suggestion + ' already exists'
+    finally:
+        cmds.undoInfo(closeChunk=True)
+
+    return skipped
+
+
+def naming(department, kind, check_name, button_clicked):
+    """
+    Checking or fixing the names of one kind of nodes
+
+    Args:
+        department (str): Department of the rules i.e.: 'Rigging'
+        kind (str): 'Controllers' or 'Joints'
+        check_name (str): Name of the check for the report
+        button_clicked (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+
+    Returns:
+        str: Status of the qc check i.e.: passed, warning or failed
+        dict: Report of invalid names and their suggested name when check fails
+        int: A flag sent back to the main: 0 for passed, 1 for failed
+    """
+    status_flag = 'passed'
+    button_switch = 0
+    naming_report = {}
+
+    regex, rule, aliases = load_rules(department, kind)
+    nodes = list_named_nodes()[kind]
+    invalid = invalid_names([short_name(node) for node in nodes], regex)
+    suggestions = suggest_names(invalid, rule, aliases)
+    invalid_nodes = [node for node in nodes if short_name(node) in invalid]
+
+    # Running the check
+    if button_clicked == 'run_button':
+        if invalid_nodes:
+            status_flag = 'failed'
+
+            # Filling the list report
+            for node in invalid_nodes:
+                suggestion = suggestions[short_name(node)]
+                if suggestion is None:
+                    naming_report[node] = [["<b style='color:rgb(255,0,0);'>" + check_name + " failed:</b> " + str(short_name(node)) + ' has more than ' + str(rule['max_tokens']) + ' name tokens, rename it manually']]
+                else:
+                    naming_report[node] = [["<b style='color:rgb(255,0,0);'>" + check_name + " failed:</b> " + str(short_name(node)) + ' should be named: ' + suggestion]]
+
+    # Running the fix
+    elif button_clicked == 'fix_button':
+        manual = [node for node in invalid_nodes if suggestions[short_name(node)] is None]
+        skipped = rename_nodes([node for node in invalid_nodes if suggestions[short_name(node)] is not None], suggestions)
+        skipped.update((node, 'more than ' + str(rule['max_tokens']) + ' name tokens') for node in manual)
+
+        # Keeping the skipped nodes in the report, they need a manual rename
+        if skipped:
+            status_flag = 'failed'
+            button_switch = 1
+            for node, reason in sorted(skipped.items()):
+                naming_report[node] = [["<b style='color:rgb(255,0,0);'>" + check_name + " skipped:</b> " + str(short_name(node)) + ': ' + reason]]
+
+    return (status_flag,
+            naming_report,
+            button_switch
+            )
+
+
+@qc_profiler.profile
+def controllers_naming(button_clicked, department='Rigging'):
+    """
+    Main function called from the UI to check the controllers names
+    """
+    return naming(department, 'Controllers', 'Controllers Naming', button_clicked)
+
+
+@qc_profiler.profile
+def joints_naming(button_clicked, department='Rigging'):
+    """
+    Main function called from the UI to check the joints names
+    """
+    return naming(department, 'Joints', 'Joints Naming', button_clicked)
@@ -0,0 +1,104 @@
+# **************************************************************************************************************
+# content       = undoable bulk skin weights write: a small API command wrapping MFnSkinCluster.setWeights()
+#
+# how to        = skin_weights_command.set_weights('skinCluster1', vertex_ids, weights)
+# dependencies  = Maya, numpy
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import numpy as np
+import maya.cmds as cmds
+import maya.api.OpenMaya as om
+import maya.api.OpenMayaAnim as oma
+
+# **************************************************************************************************************
+
+COMMAND_NAME = 'qcSetSkinWeights'
+PLUGIN_PATH = os.path.splitext(os.path.abspath(__file__))[0] + '.py'
+
+# Writes waiting for the command, commands only take strings: the arrays are handed over here
+PENDING = []
+
+
+def maya_useNewAPI():
+    """
+    Tells Maya the plugin uses the Python API 2.0
+    """
+    pass
+
+
+def skin_objects(skin_cluster, vertex_ids):
+    """
+    Returns:
+        MFnSkinCluster: The skinCluster function set
+        MDagPath: The skinned mesh
+        MObject: The vertices' component
+    """
+    selection = om.MSelectionList()
+    selection.add(skin_cluster)
+    skin_fn = oma.MFnSkinCluster(selection.getDependNode(0))
+    mesh_path = om.MDagPath.getAPathTo(skin_fn.getOutputGeometry()[0])
+
+    component_fn = om.MFnSingleIndexedComponent()
+    component = component_fn.create(om.MFn.kMeshVertComponent)
+    component_fn.addElements(om.MIntArray(vertex_ids))
+    return skin_fn, mesh_path, component
+
+
+class SetSkinWeights(om.MPxCommand):
+    """
+    Writes a whole weight matrix with one setWeights() call and keeps the old weights for the undo
+    """
+    def __init__(self):
+        super(SetSkinWeights, self).__init__()
+        self.write = None
+        self.old_weights = None
+
+    def doIt(self, args):
+        # The plugin may be loaded under another module name, the pending writes live in the package module
+        from checks.rigging import skin_weights_command
+        self.write = skin_weights_command.PENDING.pop(0)
+        self.redoIt()
+
+    def redoIt(self):
+        skin_cluster, vertex_ids, weights = self.write
+        skin_fn, mesh_path, component = skin_objects(skin_cluster, vertex_ids)
+        self.old_weights = skin_fn.setWeights(mesh_path, component, om.MIntArray(list(range(weights.shape[1]))),
+                                              om.MDoubleArray(weights.ravel().tolist()), False, True)
+
+    def undoIt(self):
+        skin_cluster, vertex_ids, weights = self.write
+        skin_fn, mesh_path, component = skin_objects(skin_cluster, vertex_ids)
+        skin_fn.setWeights(mesh_path, component, om.MIntArray(list(range(weights.shape[1]))), self.old_weights, False)
+
+    def isUndoable(self):
+        return True
+
+
+def initializePlugin(plugin):
+    om.MFnPlugin(plugin).registerCommand(COMMAND_NAME, SetSkinWeights)
+
+
+def uninitializePlugin(plugin):
+    om.MFnPlugin(plugin).deregisterCommand(COMMAND_NAME)
+
+
+def set_weights(skin_cluster, vertex_ids, weights):
+    """
+    Writing the weights of 'vertex_ids' in one undoable call, the command's plugin is loaded on first use
+
+    Args:
+        skin_cluster (str): skinCluster name
+        vertex_ids (np.ndarray): Vertex ids of the rows
+        weights (np.ndarray): (vertices, influences) weights, in the skinCluster's influenceObjects() order
+    """
+    if not cmds.pluginInfo(PLUGIN_PATH, query=True, loaded=True):
+        cmds.loadPlugin(PLUGIN_PATH, quiet=True)
+
+    PENDING.append((skin_cluster, vertex_ids.tolist(), np.asarray(weights, dtype=np.float64)))
+    try:
+        getattr(cmds, COMMAND_NAME)()
+    finally:
+        del PENDING[:]
@@ -9,7 +9,9 @@
 
 import os
 import sys
+import time
 import importlib
+import maya.cmds as cmds
 import maya.OpenMayaUI as omUI
 from shiboken2 import wrapInstance
 
@@ -21,6 +23,15 @@ from PySide2 import QtWidgets
 from scripts import qc_ui
 importlib.reload(qc_ui)
 
+from scripts import qc_logger
+importlib.reload(qc_logger)
+
+from scripts import qc_diff
+importlib.reload(qc_diff)
+
+from scripts import qc_history
+importlib.reload(qc_history)
+
 from checks.modeling import modeling_center
 importlib.reload(modeling_center)
 
@@ -33,11 +44,84 @@ importlib.reload(modeling_scene_cleanup)
 from checks.modeling import modeling_animated_objects
 importlib.reload(modeling_animated_objects)
 
+from checks.modeling import mesh_data
+importlib.reload(mesh_data)
+
+from checks.modeling import modeling_topology
+importlib.reload(modeling_topology)
+
+from checks.modeling import modeling_duplicates
+importlib.reload(modeling_duplicates)
+
+from checks.modeling import modeling_uvs
+importlib.reload(modeling_uvs)
+
+from checks.modeling import modeling_normals
+importlib.reload(modeling_normals)
+
+from checks.rigging import rigging_control_color
+importlib.reload(rigging_control_color)
+
+from checks.rigging import rigging_control_shapes
+importlib.reload(rigging_control_shapes)
+
+from checks.rigging import rigging_joints_influence
+importlib.reload(rigging_joints_influence)
+
+from checks.rigging import rigging_naming
+importlib.reload(rigging_naming)
+
+from checks.animation import anim_curves
+importlib.reload(anim_curves)
+
+from checks.animation import animation_redundant_keyframes
+importlib.reload(animation_redundant_keyframes)
+
+from checks.animation import animation_keyframe_analysis
+importlib.reload(animation_keyframe_analysis)
+
+from checks.animation import animation_rigging_checks
+importlib.reload(animation_rigging_checks)
+
+from checks.common import common_layer_organization
+importlib.reload(common_layer_organization)
+
+from checks.common import common_scene_cleanup
+importlib.reload(common_scene_cleanup)
+
 from checks import save_increment
 importlib.reload(save_increment)
 
 # **************************************************************************************************************
 
+LOG = qc_logger.init()
+
+# Check name -> module's main function, run through QCChecks.department_check()
+MODELING_CHECKS = {'Duplicate Meshes':          modeling_duplicates.duplicate_meshes,
+                   'Normals':                   modeling_normals.normals,
+                   'Topology':                  modeling_topology.topology,
+                   'UV Layout':                 modeling_uvs.uv_layout}
+# Every Modeling check, the legacy ones run through their own QCChecks methods, for the batch runs (qc_export)
+ALL_MODELING_CHECKS = dict({'Animated Objects':        modeling_animated_objects.animated_objects,
+                            'Center':                  modeling_center.meshes_center,
+                            'Freeze Transform':        modeling_xform.meshes_xform,
+                            'Scene Cleanup':           modeling_scene_cleanup.illegal_cleanup},
+                           **MODELING_CHECKS)
+RIGGING_CHECKS = {'Animated Objects':          modeling_animated_objects.animated_objects,
+                  'Control Shape Consistency': rigging_control_shapes.control_shapes,
+                  'Control Colors':            rigging_control_color.control_colors,
+                  'Controllers Naming':        rigging_naming.controllers_naming,
+                  'Joints Influence Count':    rigging_joints_influence.joints_influence,
+                  'Joints Naming':             rigging_naming.joints_naming,
+                  'Layer Organization':        common_layer_organization.rigging_layer_organization,
+                  'Scene Cleanup':             common_scene_cleanup.rigging_scene_cleanup}
+ANIMATION_CHECKS = {'Keyframe Analysis':        animation_keyframe_analysis.keyframe_analysis,
+                    'In-Betweens':              animation_keyframe_analysis.in_betweens,
+                    'Layer Organization':       common_layer_organization.animation_layer_organization,
+                    'Redundant Keyframes':      animation_redundant_keyframes.redundant_keyframes,
+                    'Rigging Checks':           animation_rigging_checks.rigging_checks,
+                    'Scene Cleanup':            common_scene_cleanup.animation_scene_cleanup}
+
 
 class QCChecks:
     """
@@ -53,23 +137,37 @@ class QCChecks:
         self.modeling_reports = {'Animated Objects':          ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Center':                    ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Freeze Transform':          ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
-                                 'Scene Cleanup':             ({}, {'passed': 0, 'warning': 0, 'failed': 0})}
+                                 'Scene Cleanup':             ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
+                                 'Topology':                  ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
+                                 'Duplicate Meshes':          ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
+                                 'UV Layout':                 ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
+                                 'Normals':                   ({}, {'passed': 0, 'warning': 0, 'failed': 0})}
         self.rigging_reports = {'Animated Objects':           ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Control Shape Consistency': ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Controllers Naming':        ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Joints Influence Count':    ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Layer Organization':        ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                  'Scene Cleanup':             ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
-                                 'Joints Naming':             ({}, {'passed': 0, 'warning': 0, 'failed': 0})}
+                                 'Joints Naming':             ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
+                                 'Control Colors':            ({}, {'passed': 0, 'warning': 0, 'failed': 0})}
         self.animation_reports = {'Keyframe Analysis':        ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                   'In-Betweens':              ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                   'Rigging Checks':           ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                   'Redundant Keyframes':      ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                   'Scene Cleanup':            ({}, {'passed': 0, 'warning': 0, 'failed': 0}),
                                   'Layer Organization':       ({}, {'passed': 0, 'warning': 0, 'failed': 0})}
+        self.reports = {'Modeling':  self.modeling_reports,
+                        'Rigging':   self.rigging_reports,
+                        'Animation': self.animation_reports}
 
         self.publish_button = 0
 
+        # Statuses currently painted in the UI, only the ones that change are repainted
+        self.shown_statuses = {}
+
+        # Last QC history write, its failure is shown on the next run
+        self.history_write = None
+
         # Creating the QCChecksUI instance and show the UI
         self.qc_ui = qc_ui.QCChecksUI()
         self.qc_ui.show()
@@ -89,6 +187,7 @@ class QCChecks:
             elif self.qc_ui.run_button.text() == 'Publish':
                 self.publish_the_scene()
         self.qc_ui.run_button.clicked.connect(button_condition)
+        self.qc_ui.diff_button.clicked.connect(self.show_diff)
         self.qc_ui.department_menu.currentIndexChanged.connect(self.update_button_connection)
         for check_name, check_widget in self.qc_ui.check_widgets.items():
             check_widget.report_button.clicked.connect(lambda _=None, chk_name = check_name: self.show_report(chk_name))
@@ -122,6 +221,10 @@ class QCChecks:
 
         self.qc_ui.load_check()
 
+        # The new widgets are white: repainting the department's statuses from its last run
+        self.shown_statuses = {}
+        self.refresh_statuses()
+
         for check_name, check_widget in self.qc_ui.check_widgets.items():
             check_widget.report_button.clicked.connect(lambda _=None, chk_name=check_name: self.show_report(chk_name))
         for check_name, check_widget in self.qc_ui.check_widgets.items():
@@ -135,7 +238,12 @@ class QCChecks:
         def wrapper(self, *args, **kwargs):
             self.qc_ui.status_label.setText("Processing...")
             QtWidgets.QApplication.processEvents()
+            start_time = time.perf_counter()
             result = func(self, *args, **kwargs)
+            self.refresh_statuses()
+            self.save_results(args[0])
+            qc_logger.log_check(LOG, func.__name__, self.qc_ui.department_menu.currentText(), '%s done', args[0],
+                                duration=time.perf_counter() - start_time)
             self.qc_ui.status_label.setText("Ready")
             return result
         return wrapper
@@ -162,6 +270,8 @@ class QCChecks:
                     self.freeze_transform(button_flag)
                 elif item == 'Scene Cleanup':
                     self.scene_cleanup(button_flag)
+                elif item in MODELING_CHECKS:
+                    self.department_check(self.modeling_reports, item, MODELING_CHECKS[item], button_flag)
         elif button_flag == 'fix_button':
             if check == 'Animated Objects':
                 self.animated_objects(button_flag)
@@ -171,6 +281,14 @@ class QCChecks:
                 self.freeze_transform(button_flag)
             elif check == 'Scene Cleanup':
                 self.scene_cleanup(button_flag)
+            elif check in MODELING_CHECKS:
+                self.department_check(self.modeling_reports, check, MODELING_CHECKS[check], button_flag)
+        self.update_publish_button()
+
+    def update_publish_button(self):
+        """
+        Switching the 'Run' button to 'Publish' when all the department's checks have passed
+        """
         if self.all_passed():
             self.publish_button = 1
             self.qc_ui.run_button.setText('Publish')
@@ -178,6 +296,78 @@ class QCChecks:
         else:
             self.publish_button = 0
 
+    def department_check(self, reports, item, check_function, button_flag):
+        """
+        Performing a check (or its fix) from its module and storing its report and status
+
+        Args:
+            reports (dict): The department reports i.e.: self.rigging_reports
+            item (str): Contains the name of the quality check
+            check_function (function): The check module's main function
+            button_flag (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+        """
+        start_time = time.perf_counter()
+        self.status_flag, check_report, self.button_switch = check_function(button_flag)
+        qc_logger.log_check(LOG, item, '-', '%s %s', button_flag, self.status_flag,
+                            duration=time.perf_counter() - start_time)
+
+        status_counts = {'passed': 0, 'warning': 0, 'failed': 0}
+        status_counts[self.status_flag] = 1
+
+        # A fix empties the report, unless the module sends back what it couldn't fix (button_switch)
+        if button_flag == 'fix_button' and not self.button_switch:
+            check_report = {}
+
+        reports[item] = (check_report, status_counts)
+
+    def refresh_statuses(self):
+        """
+        Repainting the status of the checks whose status changed since the last refresh
+        """
+        statuses = qc_diff.statuses(self.reports[self.qc_ui.department_menu.currentText()])
+        for check, status in qc_diff.diff_statuses(self.shown_statuses, statuses).items():
+            if status:
+                self.qc_ui.update_status_color(check, status)
+        self.shown_statuses = statuses
+
+    def save_results(self, button_flag):
+        """
+        Saving the department's statuses and issues next to the scene, for the next version's diff,
+        and adding the full runs to the QC history database
+
+        Args:
+            button_flag (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
+        """
+        scene_path = cmds.file(query=True, sceneName=True)
+        if scene_path:
+            department = self.qc_ui.department_menu.currentText()
+            qc_diff.save_results(qc_diff.results_path(scene_path, department), department, self.reports[department])
+            if button_flag == 'run_button':
+                if self.history_write and self.history_write.done() and self.history_write.exception():
+                    cmds.warning('The last QC run was not saved to the QC history: ' + str(self.history_write.exception()))
+                self.history_write = qc_history.record_run(department, scene_path, self.reports[department])
+
+    def show_diff(self):
+        """
+        Displaying the new, changed and resolved issues since the previous version's saved results
+        """
+        scene_path = cmds.file(query=True, sceneName=True)
+        previous_scene = qc_diff.previous_version(scene_path) if scene_path else None
+        department = self.qc_ui.department_menu.currentText()
+
+        self.qc_ui.display_report('QC Diff')
+        if not previous_scene or not os.path.exists(qc_diff.results_path(previous_scene, department)):
+            self.qc_ui.scene_report("No saved " + department + " QC results for the previous version")
+            return
+
+        diff = qc_diff.diff_results(qc_diff.load_results(qc_diff.results_path(previous_scene, department)),
+                                    qc_diff.current_results(self.reports[department]))
+        report_lines = qc_diff.diff_report(diff)
+        if report_lines:
+            self.qc_ui.scene_report('<br>'.join(report_lines))
+        else:
+            self.qc_ui.scene_report("No changes")
+
 
     def animated_objects(self, button_flag):
         """
@@ -283,28 +473,44 @@ class QCChecks:
 
     # RIGGING CHECKS
 
+    @processing_status
     def rigging_checklist(self, button_flag, check):
         """
-        Performing the Rigging checklist
+        Performing the Rigging checks or fixing them
 
         Args:
             button_flag (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
             check (str): Contains the name of the quality check
         """
-        print('Rigging Checks')
+        checks = self.qc_ui.get_checks()
+        if button_flag == 'run_button':
+            for item in checks['Rigging']:
+                if item in RIGGING_CHECKS:
+                    self.department_check(self.rigging_reports, item, RIGGING_CHECKS[item], button_flag)
+        elif button_flag == 'fix_button' and check in RIGGING_CHECKS:
+            self.department_check(self.rigging_reports, check, RIGGING_CHECKS[check], button_flag)
+        self.update_publish_button()
 
 
     # ANIMATION CHECKS *************************************************************************************************
 
+    @processing_status
     def animation_checklist(self, button_flag, check):
         """
-        Performing the Animation checklist
+        Performing the Animation checks or fixing them
 
         Args:
             button_flag (str): Contains info on the button pressed i.e.: 'Run' or 'Fix'
             check (str): Contains the name of the quality check
         """
-        print('Animation Checks')
+        checks = self.qc_ui.get_checks()
+        if button_flag == 'run_button':
+            for item in checks['Animation']:
+                if item in ANIMATION_CHECKS:
+                    self.department_check(self.animation_reports, item, ANIMATION_CHECKS[item], button_flag)
+        elif button_flag == 'fix_button' and check in ANIMATION_CHECKS:
+            self.department_check(self.animation_reports, check, ANIMATION_CHECKS[check], button_flag)
+        self.update_publish_button()
 
 
     def department_reports_creation(self, report, button_switch, button_flag, item_text):
@@ -364,38 +570,22 @@ class QCChecks:
         Args:
             check (str): Contains the name of the quality check
         """
-        report_string = ""
-        selected_department = self.qc_ui.department_menu.currentText()
-        if selected_department == 'Modeling':
-            if self.modeling_reports[check][0]:
-                for secondary_key in self.modeling_reports[check][0]:
-                    report_string = '<br>'.join(self.modeling_reports[check][0][secondary_key][0])
-                    self.qc_ui.scene_report(report_string)
-            else:
-                report_string = "No errors"
-                self.qc_ui.scene_report(report_string)
-        elif selected_department == 'Rigging':
-            if self.rigging_reports[check][0]:
-                for secondary_key in self.rigging_reports[check][0]:
-                    report_string = '<br>'.join(self.rigging_reports[check][0][secondary_key][0])
-                    self.qc_ui.scene_report(report_string)
-            else:
-                report_string = "No errors"
-                self.qc_ui.scene_report(report_string)
-        elif selected_department == 'Animation':
-            if self.animation_reports[check][0]:
-                for secondary_key in self.animation_reports[check][0]:
-                    report_string = '<br>'.join(self.animation_reports[check][0][secondary_key][0])
-                    self.qc_ui.scene_report(report_string)
-            else:
-                report_string = "No errors"
-                self.qc_ui.scene_report(report_string)
+        reports = self.reports[self.qc_ui.department_menu.currentText()]
+
+        # Some modules share one line list between their keys: keeping each line once, in order
+        report_lines = dict.fromkeys(line
+                                     for secondary_key in reports[check][0]
+                                     for line in reports[check][0][secondary_key][0])
+        if report_lines:
+            self.qc_ui.scene_report('<br>'.join(report_lines))
+        else:
+            self.qc_ui.scene_report("No errors")
 
     def all_passed(self):
         """
-        Verify if all checks have passed in order to change the 'Run' button to 'Publish'
+        Verify if all checks of the selected department have passed in order to change the 'Run' button to 'Publish'
         """
-        for status_dict in self.modeling_reports.values():
+        for status_dict in self.reports[self.qc_ui.department_menu.currentText()].values():
             if status_dict[1]['passed'] != 1:
                 return False
         return True
@@ -0,0 +1,231 @@
+# **************************************************************************************************************
+# content       = QC results as compact issue records, saved per scene version and department and diffed between versions
+#
+# dependencies  = -
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import re
+import json
+from collections import Counter, namedtuple
+
+# **************************************************************************************************************
+
+# One report line: issues are diffed on the full record, a removed and an added record sharing
+# (check, node, category) are one changed issue
+Issue = namedtuple('Issue', ['check', 'node', 'category', 'severity', 'detail'])
+
+TAG = re.compile(r'<[^>]+>')
+LABEL = re.compile(r'^.*?\b(failed|warning):\s*')
+NUMBER = re.compile(r'[0-9]+(?:\.[0-9]+)?')
+VERSION = re.compile(r'_v([0-9]{3})')
+
+
+def parse_line(line):
+    """
+    Splitting a report line into its severity, category and detail
+
+    Args:
+        line (str): i.e.: "<b style='color:rgb(255,0,0);'>Topology failed:</b> Object a has 3 n-gons: a.f[1], ..."
+
+    Returns:
+        str: 'failed', 'warning' or 'info' for the lines without a label
+        str: The detail without its component list and with its numbers masked, i.e.: 'Object a has # n-gons'
+        str: The detail, i.e.: 'Object a has 3 n-gons: a.f[1], ...'
+    """
+    text = TAG.sub('', line).strip()
+    label = LABEL.match(text)
+    severity = label.group(1) if label else 'info'
+    detail = text[label.end():] if label else text
+    return severity, NUMBER.sub('#', detail.split(': ', 1)[0]), detail
+
+
+def report_lines(report):
+    """
+    Yielding each line of a check's report with its node, each line once per node:
+    a node can hold the same line list more than once, i.e.: Freeze Transform's rotation and scale
+
+    Args:
+        report (dict): Node as key, list of html line lists as value
+
+    Yields:
+        tuple: (node, line)
+    """
+    for node, line_lists in report.items():
+        for line in dict.fromkeys(line for line_list in line_lists for line in line_list):
+            yield node, line
+
+
+def issue_records(reports):
+    """
+    Flattening a department's reports into issue records
+
+    Args:
+        reports (dict): Check name as key, (report, status counts) as value, i.e.: QCChecks.rigging_reports
+
+    Returns:
+        list: Issue records
+    """
+    records = []
+    for check, (report, _) in reports.items():
+        for node, line in report_lines(report):
+            severity, category, detail = parse_line(line)
+            records.append(Issue(check, node, category, severity, detail))
+    return records
+
+
+def statuses(reports):
+    """
+    Args:
+        reports (dict): Check name as key, (report, status counts) as value
+
+    Returns:
+        dict: Check name as key, 'passed', 'warning', 'failed' or None (not run) as value
+    """
+    return {check: next((status for status, count in counts.items() if count), None)
+            for check, (_, counts) in reports.items()}
+
+
+def diff_statuses(old, new):
+    """
+    Returns:
+        dict: Check name as key, new status as value, only for the checks whose status changed
+    """
+    return {check: status for check, status in new.items() if old.get(check) != status}
+
+
+def diff_issues(old, new):
+    """
+    Comparing the full issue records as multisets, then pairing the removed and added records
+    sharing a (check, node, category) key as changed issues
+
+    Args:
+        old (iterable): Issue records of the previous version
+        new (iterable): Issue records of the current version
+
+    Returns:
+        dict: 'new' and 'resolved' sorted issue lists, 'changed' sorted (old, new) issue pairs
+    """
+    old_counts, new_counts = Counter(old), Counter(new)
+    removed = sorted((old_counts - new_counts).elements())
+    added = sorted((new_counts - old_counts).elements())
+
+    removed_keys = {}
+    for issue in removed:
+        removed_keys.setdefault(issue[:3], []).append(issue)
+
+    diff = {'new': [], 'resolved': [], 'changed': []}
+    for issue in added:
+        if removed_keys.get(issue[:3]):
+            diff['changed'].append((removed_keys[issue[:3]].pop(0), issue))
+        else:
+            diff['new'].append(issue)
+    diff['resolved'] = sorted(issue for issues in removed_keys.values() for issue in issues)
+    return diff
+
+
+def results_path(scene_path, department):
+    """
+    Returns:
+        str: Path of a scene's saved QC results for one department, i.e.: '.../qc/mdl_asset_v012.modeling.qc.json',
+             each department's run only overwrites its own results
+    """
+    folder, file_name = os.path.split(scene_path)
+    return os.path.join(folder, 'qc', os.path.splitext(file_name)[0] + '.' + department.lower() + '.qc.json')
+
+
+def previous_version(scene_path):
+    """
+    Returns:
+        str: The previous version's scene path, i.e.: 'mdl_asset_v012.ma' for 'mdl_asset_v013.ma',
+             None when the scene has no version or is the first one
+    """
+    versions = list(VERSION.finditer(os.path.basename(scene_path)))
+    if not versions or int(versions[-1].group(1)) <= 1:
+        return None
+    folder, file_name = os.path.split(scene_path)
+    start, end = versions[-1].span(1)
+    return os.path.join(folder, file_name[:start] + '{:03}'.format(int(versions[-1].group(1)) - 1) + file_name[end:])
+
+
+def save_results(path, department, reports):
+    """
+    Saving a department's statuses and issue records
+
+    Args:
+        path (str): From results_path()
+        department (str): i.e.: 'Modeling'
+        reports (dict): Check name as key, (report, status counts) as value
+    """
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    with open(path, 'w') as stream:
+        json.dump({'department': department,
+                   'statuses': statuses(reports),
+                   'issues': sorted(issue_records(reports))}, stream, indent=1)
+
+
+def load_results(path):
+    """
+    Returns:
+        dict: Check name as key, status as value
+        list: Issue records
+    """
+    with open(path, 'r') as stream:
+        results = json.load(stream)
+    return results['statuses'], [Issue(*issue) for issue in results['issues']]
+
+
+def current_results(reports):
+    """
+    Returns:
+        tuple: The statuses and issue records of a department's reports, like load_results()
+    """
+    return statuses(reports), issue_records(reports)
+
+
+def diff_results(old_results, new_results):
+    """
+    Args:
+        old_results (tuple): Statuses and issue records from load_results() or current_results()
+        new_results (tuple): Statuses and issue records from load_results() or current_results()
+
+    Returns:
+        dict: From diff_issues() with 'statuses', the checks whose status changed
+    """
+    diff = diff_issues(old_results[1], new_results[1])
+    diff['statuses'] = diff_statuses(old_results[0], new_results[0])
+    return diff
+
+
+def diff_files(old_path, new_path):
+    """
+    Diffing two saved results
+    """
+    return diff_results(load_results(old_path), load_results(new_path))
+
+
+def diff_scenes(old_scene, new_scene, department):
+    """
+    Diffing a department's saved results of two scene files
+    """
+    return diff_files(results_path(old_scene, department), results_path(new_scene, department))
+
+
+def diff_report(diff):
+    """
+    Returns:
+        list: Html lines of a diff for the report area
+    """
+    lines = []
+    for check, status in sorted(diff.get('statuses', {}).items()):
+        lines.append('<b>' + check + '</b> is now ' + str(status))
+    for issue in diff['new']:
+        lines.append("<b style='color:rgb(255,0,0);'>New:</b> " + issue.check + ' - ' + issue.detail)
+    for old_issue, new_issue in diff['changed']:
+        lines.append("<b style='color:rgb(255,165,0);'>Changed:</b> " + new_issue.check + ' - ' + old_issue.detail + ' &rarr; ' + new_issue.detail)
+    for issue in diff['resolved']:
+        lines.append("<b style='color:rgb(0,170,0);'>Resolved:</b> " + issue.check + ' - ' + issue.detail)
+    return lines
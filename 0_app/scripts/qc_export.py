@@ -0,0 +1,142 @@
+# **************************************************************************************************************
+# content       = streams the QC issues to JSON Lines or CSV files, optionally gzip compressed
+#
+# how to        = qc_export.export(qc_export.report_rows('Modeling', reports), 'qc/mdl_asset_v012.jsonl.gz')
+#                 qc_export.export(qc_export.check_rows('Modeling', qc.ALL_MODELING_CHECKS), 'qc/mdl_asset_v012.csv')
+# dependencies  = Python
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import csv
+import gzip
+import json
+
+from scripts import qc_diff
+
+# **************************************************************************************************************
+
+FIELDS = ('department', 'check', 'status', 'node', 'severity', 'category', 'detail')
+
+
+def line_rows(department, check, status, report):
+    """
+    Yielding one row per report line of a check
+
+    Args:
+        department (str): i.e.: 'Modeling'
+        check (str): Name of the check
+        status (str): Status of the check i.e.: passed, warning or failed
+        report (dict): Node as key, list of html line lists as value
+
+    Yields:
+        dict: FIELDS as keys
+    """
+    for node, line in qc_diff.report_lines(report):
+        severity, category, detail = qc_diff.parse_line(line)
+        yield {'department': department, 'check': check, 'status': status, 'node': node,
+               'severity': severity, 'category': category, 'detail': detail}
+
+
+def report_rows(department, reports):
+    """
+    Yielding the rows of a department's stored reports, i.e.: QCChecks.modeling_reports
+
+    Args:
+        department (str): i.e.: 'Modeling'
+        reports (dict): Check name as key, (report, status counts) as value
+
+    Yields:
+        dict: FIELDS as keys
+    """
+    for check, status in qc_diff.statuses(reports).items():
+        yield from line_rows(department, check, status, reports[check][0])
+
+
+def check_rows(department, checks):
+    """
+    Running the checks one at a time and yielding their rows as each check finishes, a check's report
+    is dropped before the next check runs.
+
+    Args:
+        department (str): i.e.: 'Modeling'
+        checks (dict): Check name as key, check module's main function as value, i.e.: qc.ALL_MODELING_CHECKS
+
+    Yields:
+        dict: FIELDS as keys
+    """
+    for check, check_function in checks.items():
+        status_flag, check_report, _ = check_function('run_button')
+        yield from line_rows(department, check, status_flag, check_report)
+
+
+def open_output(path, compress=None):
+    """
+    Opening a text file for writing, gzip compressed on the fly when 'compress' is True
+    or, when 'compress' is None, when the path ends with '.gz'
+
+    Returns:
+        file: The opened file
+    """
+    if compress is None:
+        compress = path.endswith('.gz')
+    if os.path.dirname(path) and not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    if compress:
+        return gzip.open(path, 'wt', encoding='utf-8', newline='')
+    return open(path, 'w', encoding='utf-8', newline='')
+
+
+def write_jsonl(rows, stream):
+    """
+    Writing one JSON object per line
+
+    Returns:
+        int: Number of rows written
+    """
+    count = 0
+    for row in rows:
+        stream.write(json.dumps(row))
+        stream.write('\n')
+        count += 1
+    return count
+
+
+def write_csv(rows, stream):
+    """
+    Writing a header then one CSV line per row
+
+    Returns:
+        int: Number of rows written
+    """
+    writer = csv.DictWriter(stream, fieldnames=FIELDS)
+    writer.writeheader()
+    count = 0
+    for row in rows:
+        writer.writerow(row)
+        count += 1
+    return count
+
+
+def export(rows, path, file_format=None, compress=None):
+    """
+    Streaming rows to a file, one row in memory at a time
+
+    Args:
+        rows (iterable): Rows from report_rows() or check_rows()
+        path (str): Output file, i.e.: 'report.jsonl', 'report.csv.gz'
+        file_format (str): 'jsonl' or 'csv', from the path's extension when None
+        compress (bool): gzip the output, from the path's '.gz' extension when None
+
+    Returns:
+        int: Number of rows written
+    """
+    if file_format is None:
+        file_format = os.path.splitext(path[:-3] if path.endswith('.gz') else path)[1].lstrip('.')
+    writers = {'jsonl': write_jsonl, 'csv': write_csv}
+    if file_format not in writers:
+        raise ValueError('Unknown export format: ' + str(file_format))
+
+    with open_output(path, compress) as stream:
+        return writers[file_format](rows, stream)
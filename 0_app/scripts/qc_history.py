@@ -0,0 +1,200 @@
+# **************************************************************************************************************
+# content       = QC runs history in a local SQLite database, with trend queries for the pipeline TDs
+#
+# how to        = qc_history.record_run('Modeling', scene_path, reports)
+#                 qc_history.failure_rates(days=30)
+#                 qc_history.failing_assets('Topology')
+# dependencies  = Python
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import re
+import time
+import atexit
+import logging
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from scripts import qc_diff
+from scripts import qc_logger
+
+# **************************************************************************************************************
+
+HISTORY_PATH = os.environ.get('QC_HISTORY_PATH', os.path.join(os.path.expanduser('~'), '.qc', 'qc_history.db'))
+
+DEPARTMENT_PREFIX = re.compile(r'^(mdl|rig|ani)_')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, asset TEXT, department TEXT, version INTEGER,
+                                 scene TEXT, timestamp REAL);
+CREATE TABLE IF NOT EXISTS results (run_id INTEGER REFERENCES runs(id), check_name TEXT, status TEXT,
+                                    issue_count INTEGER);
+CREATE TABLE IF NOT EXISTS issues (run_id INTEGER REFERENCES runs(id), check_name TEXT, node TEXT,
+                                   category TEXT, severity TEXT, detail TEXT);
+CREATE INDEX IF NOT EXISTS runs_asset ON runs (asset);
+CREATE INDEX IF NOT EXISTS runs_department ON runs (department);
+CREATE INDEX IF NOT EXISTS runs_version ON runs (asset, version);
+CREATE INDEX IF NOT EXISTS runs_timestamp ON runs (timestamp);
+CREATE INDEX IF NOT EXISTS results_check ON results (check_name, status);
+CREATE INDEX IF NOT EXISTS results_run ON results (run_id);
+CREATE INDEX IF NOT EXISTS issues_run ON issues (run_id, check_name);
+"""
+
+LOG = qc_logger.init()
+
+# One writer thread: the checks never wait on the database.
+# Module reloaded in Maya: the previous writer finishes its pending writes and stops before being replaced
+if '_writer' in globals():
+    _writer.shutdown(wait=True)
+_writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='qc_history')
+
+
+def connect(path=HISTORY_PATH):
+    """
+    Opening the database, creating its tables and indexes the first time
+
+    Args:
+        path (str): Database file
+
+    Returns:
+        sqlite3.Connection: The connection
+    """
+    if not os.path.exists(os.path.dirname(path)):
+        os.makedirs(os.path.dirname(path))
+    connection = sqlite3.connect(path, timeout=30)
+    # Readers (trend queries from other sessions) don't block the writer
+    connection.execute('PRAGMA journal_mode=WAL')
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def scene_info(scene_path):
+    """
+    Returns:
+        str: The asset name, i.e.: 'asset' for 'mdl_asset_v012.ma'
+        int: The version, None when the scene has no version
+    """
+    name = os.path.splitext(os.path.basename(scene_path))[0]
+    versions = list(qc_diff.VERSION.finditer(name))
+    version = int(versions[-1].group(1)) if versions else None
+    if versions:
+        name = name[:versions[-1].start()]
+    return DEPARTMENT_PREFIX.sub('', name), version
+
+
+def write_run(run, statuses, reports, path=HISTORY_PATH):
+    """
+    Inserting one run, its check results and its issues in a single transaction
+
+    Args:
+        run (tuple): (asset, department, version, scene, timestamp)
+        statuses (dict): Check name as key, status as value
+        reports (dict): Check name as key, (report, status counts) as value
+        path (str): Database file
+
+    Returns:
+        int: The run id
+    """
+    issues = qc_diff.issue_records(reports)
+    issue_counts = {}
+    for issue in issues:
+        issue_counts[issue.check] = issue_counts.get(issue.check, 0) + 1
+
+    connection = connect(path)
+    try:
+        with connection:
+            run_id = connection.execute('INSERT INTO runs (asset, department, version, scene, timestamp) '
+                                        'VALUES (?, ?, ?, ?, ?)', run).lastrowid
+            connection.executemany('INSERT INTO results VALUES (?, ?, ?, ?)',
+                                   ((run_id, check, status, issue_counts.get(check, 0))
+                                    for check, status in statuses.items() if status))
+            connection.executemany('INSERT INTO issues VALUES (?, ?, ?, ?, ?, ?)',
+                                   ((run_id,) + issue for issue in issues))
+    finally:
+        connection.close()
+    return run_id
+
+
+def record_run(department, scene_path, reports, path=HISTORY_PATH):
+    """
+    Persisting a department's run. The statuses are read here, the status counts are updated in place
+    by the checklists, the reports are parsed and inserted on the writer thread.
+
+    Args:
+        department (str): i.e.: 'Modeling'
+        scene_path (str): The scene the checks ran on
+        reports (dict): Check name as key, (report, status counts) as value
+        path (str): Database file
+
+    Returns:
+        concurrent.futures.Future: The run id once written, or the write's exception
+    """
+    asset, version = scene_info(scene_path)
+    run = (asset, department, version, scene_path, time.time())
+    future = _writer.submit(write_run, run, qc_diff.statuses(reports), dict(reports), path)
+    future.add_done_callback(log_failure)
+    return future
+
+
+def log_failure(future):
+    """
+    Logging a failed write, the exception stays on the future for the caller
+    """
+    error = future.exception()
+    if error is not None:
+        qc_logger.log_check(LOG, 'QC History', '-', 'run not saved: %s: %s', type(error).__name__, error,
+                            level=logging.ERROR)
+
+
+def failure_rates(days=30, department=None, path=HISTORY_PATH):
+    """
+    Failure rate per check over the last 'days'
+
+    Returns:
+        list: (check, runs, failures, failure rate) tuples, highest rate first
+    """
+    query = ('SELECT results.check_name, COUNT(*), SUM(results.status = \'failed\') '
+             'FROM results JOIN runs ON runs.id = results.run_id '
+             'WHERE runs.timestamp >= ?' + (' AND runs.department = ?' if department else '') +
+             ' GROUP BY results.check_name')
+    parameters = (time.time() - days * 86400.0,) + ((department,) if department else ())
+
+    connection = connect(path)
+    try:
+        rows = connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
+    return sorted(((check, runs, failures, failures / float(runs)) for check, runs, failures in rows),
+                  key=lambda row: (-row[3], row[0]))
+
+
+def failing_assets(check, department=None, path=HISTORY_PATH):
+    """
+    Assets whose latest run of 'check' failed
+
+    Returns:
+        list: (asset, department, version, scene, timestamp) tuples, most recent first
+    """
+    query = ('SELECT runs.asset, runs.department, runs.version, runs.scene, MAX(runs.timestamp), results.status '
+             'FROM results JOIN runs ON runs.id = results.run_id '
+             'WHERE results.check_name = ?' + (' AND runs.department = ?' if department else '') +
+             ' GROUP BY runs.asset, runs.department')
+    parameters = (check,) + ((department,) if department else ())
+
+    connection = connect(path)
+    try:
+        rows = connection.execute(query, parameters).fetchall()
+    finally:
+        connection.close()
+    # SQLite takes the bare columns from the MAX() row: the status is the latest one
+    return sorted((row[:5] for row in rows if row[5] == 'failed'), key=lambda row: -row[4])
+
+
+@atexit.register
+def shutdown():
+    """
+    Finishing the pending writes.
+    """
+    _writer.shutdown(wait=True)
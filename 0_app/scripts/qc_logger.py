@@ -0,0 +1,196 @@
+# **************************************************************************************************************
+# content       = structured, queue backed logging for the qc checks
+#
+# how to        = LOG = qc_logger.init()
+#                 qc_logger.log_check(LOG, 'Center', 'pCube1', 'not centered', duration=0.002)
+# dependencies  = Python
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import sys
+import copy
+import time
+import queue
+import atexit
+import logging
+import logging.handlers
+
+# **************************************************************************************************************
+
+LOG_FORMAT = '%(asctime)s %(levelname)-7s %(check)s | %(node)s | %(duration)s | %(message)s'
+RATE_LIMIT_COUNT = 20
+RATE_LIMIT_INTERVAL = 10.0
+
+_srcfile = os.path.normcase(logging.__file__.replace('.pyc', '.py'))
+_thisfile = os.path.normcase(__file__.replace('.pyc', '.py'))
+
+# Code object -> True when the frame belongs to the logging machinery
+_skip_codes = {}
+
+# Logger name -> running QueueListener, kept across reloads so init() never starts a second listener
+_listeners = globals().get('_listeners', {})
+
+
+def _is_logging_code(code):
+    """
+    Normalizing a filename once per code object instead of once per frame and record.
+
+    Args:
+        code (code): The code object of a stack frame
+
+    Returns:
+        bool: True if the frame is inside 'logging' or this module
+    """
+    skip = _skip_codes.get(code)
+    if skip is None:
+        filename = os.path.normcase(code.co_filename)
+        skip = filename in (_srcfile, _thisfile)
+        _skip_codes[code] = skip
+    return skip
+
+
+class QCLogger(logging.Logger):
+    """
+    Logger whose caller lookup uses the per code object cache.
+    """
+    def findCaller(self, stack_info=False, stacklevel=1):
+        frame = sys._getframe(1)
+        while frame is not None and _is_logging_code(frame.f_code):
+            frame = frame.f_back
+
+        while frame is not None and stacklevel > 1:
+            frame = frame.f_back
+            stacklevel -= 1
+
+        if frame is None:
+            return '(unknown file)', 0, '(unknown function)', None
+        code = frame.f_code
+        return code.co_filename, frame.f_lineno, code.co_name, None
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Letting through at most 'count' records with the same check and message template per 'interval'.
+    The number of dropped records is attached to the next record that passes.
+    """
+    def __init__(self, count=RATE_LIMIT_COUNT, interval=RATE_LIMIT_INTERVAL):
+        super().__init__()
+        self.count = count
+        self.interval = interval
+        self.windows = {}
+
+    def filter(self, record):
+        key = (getattr(record, 'check', ''), record.msg)
+        now = time.monotonic()
+        start, passed, dropped = self.windows.get(key, (now, 0, 0))
+
+        if now - start > self.interval:
+            start, passed = now, 0
+
+        if passed >= self.count:
+            self.windows[key] = (start, passed, dropped + 1)
+            return False
+
+        record.suppressed = dropped
+        self.windows[key] = (start, passed + 1, 0)
+        return True
+
+
+class QCQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queueing the record untouched, message merging happens on the listener thread.
+    """
+    def prepare(self, record):
+        return record
+
+
+class QCFormatter(logging.Formatter):
+    """
+    Filling the structured fields with defaults for records not sent through log_check.
+    """
+    def format(self, record):
+        # Every handler formats the same record: the fields are filled on a copy
+        record = copy.copy(record)
+        record.check = getattr(record, 'check', '-')
+        record.node = getattr(record, 'node', '-')
+        duration = getattr(record, 'duration', None)
+        record.duration = '-' if duration is None else f'{duration * 1000.0:.3f}ms'
+        message = super().format(record)
+        if getattr(record, 'suppressed', 0):
+            message += f' ({record.suppressed} similar messages suppressed)'
+        return message
+
+
+def init(name='qc', level=logging.INFO, log_path=None):
+    """
+    Creating (once) the qc logger. Records go through a queue and are formatted
+    and written by a background listener thread, so the checks never wait on I/O.
+
+    Args:
+        name (str): Logger name
+        level (int): Logging level
+        log_path (str): Optional log file, the stream handler is always added
+
+    Returns:
+        logging.Logger: The qc logger
+    """
+    if name in _listeners:
+        return logging.getLogger(name)
+
+    logger_class = logging.getLoggerClass()
+    logging.setLoggerClass(QCLogger)
+    logger = logging.getLogger(name)
+    logging.setLoggerClass(logger_class)
+
+    logger.setLevel(level)
+    logger.propagate = False
+
+    # Module reloaded in Maya: the logger survives but its old queue is orphaned
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+
+    formatter = QCFormatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_path:
+        handlers.append(logging.FileHandler(log_path))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = QCQueueHandler(log_queue)
+    queue_handler.addFilter(RateLimitFilter())
+    logger.addHandler(queue_handler)
+
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    _listeners[name] = listener
+
+    return logger
+
+
+def log_check(logger, check, node, message, *args, duration=None, level=logging.INFO):
+    """
+    Emitting one structured record. Formatting is deferred to the listener thread.
+
+    Args:
+        logger (logging.Logger): Logger from init()
+        check (str): Name of the qc check
+        node (str): Maya node the record is about
+        message (str): Message template, %-style
+        duration (float): Optional duration in seconds
+        level (int): Logging level
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, message, *args, extra={'check': check, 'node': node, 'duration': duration})
+
+
+@atexit.register
+def shutdown():
+    """
+    Flushing and stopping every listener thread.
+    """
+    for listener in _listeners.values():
+        listener.stop()
+    _listeners.clear()
@@ -0,0 +1,134 @@
+# **************************************************************************************************************
+# content       = profiling decorator and context manager for the qc checks and fixes
+#
+# how to        = @qc_profiler.profile
+#                 with qc_profiler.section('name'): ...
+#                 qc_profiler.dump()
+#                 Enabled with the environment variable QC_PROFILE=1, before the modules are imported
+# dependencies  = Python
+#
+# author  = Stephane Barbin
+# **************************************************************************************************************
+
+import os
+import sys
+import math
+import time
+import functools
+import contextlib
+
+# **************************************************************************************************************
+
+ENABLED = os.environ.get('QC_PROFILE', '0') not in ('', '0')
+
+# Histogram resolution: 4 buckets per power of two (~19% wide)
+BUCKETS_PER_OCTAVE = 4
+
+# Name -> [count, total_ns, max_ns, {bucket: count}]
+_stats = {}
+
+
+def record(name, elapsed_ns):
+    """
+    Adding one duration to the histogram of 'name'
+
+    Args:
+        name (str): Profiled function or section
+        elapsed_ns (int): Duration in nanoseconds
+    """
+    stats = _stats.get(name)
+    if stats is None:
+        stats = _stats[name] = [0, 0, 0, {}]
+    stats[0] += 1
+    stats[1] += elapsed_ns
+    if elapsed_ns > stats[2]:
+        stats[2] = elapsed_ns
+    bucket = int(math.log2(elapsed_ns) * BUCKETS_PER_OCTAVE) if elapsed_ns > 0 else 0
+    stats[3][bucket] = stats[3].get(bucket, 0) + 1
+
+
+def profile(func):
+    """
+    Decorator timing every call of 'func'. Returns 'func' itself when profiling is disabled.
+    """
+    if not ENABLED:
+        return func
+
+    name = f'{func.__module__}.{func.__qualname__}'
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start_time = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            record(name, time.perf_counter_ns() - start_time)
+    return wrapper
+
+
+@contextlib.contextmanager
+def _section(name):
+    start_time = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter_ns() - start_time)
+
+
+def section(name):
+    """
+    Context manager timing a block of code. A no-op context when profiling is disabled.
+    """
+    if not ENABLED:
+        return contextlib.nullcontext()
+    return _section(name)
+
+
+def percentile(buckets, count, fraction):
+    """
+    Returns the upper bound (ns) of the bucket holding the given fraction of the calls
+    """
+    target = fraction * count
+    seen = 0
+    for bucket in sorted(buckets):
+        seen += buckets[bucket]
+        if seen >= target:
+            return 2 ** ((bucket + 1) / BUCKETS_PER_OCTAVE)
+    return 0
+
+
+def report():
+    """
+    Returns:
+        dict: Name as key, dict of count, total, mean, p50, p95 and max (in seconds) as value
+    """
+    results = {}
+    for name, (count, total_ns, max_ns, buckets) in _stats.items():
+        results[name] = {'count': count,
+                         'total': total_ns / 1e9,
+                         'mean':  total_ns / count / 1e9,
+                         'p50':   min(percentile(buckets, count, 0.50), max_ns) / 1e9,
+                         'p95':   min(percentile(buckets, count, 0.95), max_ns) / 1e9,
+                         'max':   max_ns / 1e9}
+    return results
+
+
+def dump(stream=None):
+    """
+    Writing the histograms summary, slowest total first
+
+    Args:
+        stream (file): Defaults to sys.stdout
+    """
+    stream = stream or sys.stdout
+    stream.write(f'{"name":<60} {"count":>8} {"total":>10} {"p50":>10} {"p95":>10} {"max":>10}\n')
+    for name, stats in sorted(report().items(), key=lambda item: -item[1]['total']):
+        stream.write(f'{name:<60} {stats["count"]:>8} {stats["total"]:>9.3f}s '
+                     f'{stats["p50"] * 1000:>8.3f}ms {stats["p95"] * 1000:>8.3f}ms {stats["max"] * 1000:>8.3f}ms\n')
+
+
+def reset():
+    """
+    Clearing all the histograms
+    """
+    _stats.clear()
@@ -51,9 +51,10 @@ class QCCheckItemWidget(QtWidgets.QWidget):
         check_container_layout.setContentsMargins(0, 0, 0, 0)
         check_container_layout.setSpacing(10)
 
+        self.status_color = 'white'
         self.status_indicator = QtWidgets.QLabel()
         self.status_indicator.setFixedSize(18, 18)
-        self.status_indicator.setStyleSheet('background-color: white; border-radius: 0px;')
+        self.status_indicator.setStyleSheet(f'background-color: {self.status_color}; border-radius: 0px;')
         check_container_layout.addWidget(self.status_indicator, alignment=QtCore.Qt.AlignLeft)
 
         self.check_label = QtWidgets.QLabel(check_name)
@@ -83,7 +84,10 @@ class QCCheckItemWidget(QtWidgets.QWidget):
         self.report_button.clicked.connect(self.report_title)
 
     def set_status(self, color):
-        # Updating the status color (white, green, red)
+        # Updating the status color (white, green, red), a style sheet change repaints: only when the color changes
+        if color == self.status_color:
+            return
+        self.status_color = color
         self.status_indicator.setStyleSheet(f'background-color: {color}; border-radius: 0px;')
 
     def report_title(self):
@@ -106,6 +110,8 @@ class QCChecksUI(QtWidgets.QWidget):
         a YAML file.
         - run_button (QtWidgets.QPushButton): A button to initiate the execution
         of all QC checks.
+        - diff_button (QtWidgets.QPushButton): A button to compare the last run
+        with the previous version's saved QC results.
         - processing_label (QtWidgets.QLabel): A label to display the progress or
         status of the QC process.
     """
@@ -204,6 +210,11 @@ class QCChecksUI(QtWidgets.QWidget):
         spacer = QtWidgets.QSpacerItem(0, 0, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum)
         combined_layout.addItem(spacer)
 
+        self.diff_button = QtWidgets.QPushButton('Diff')
+        self.diff_button.setFixedWidth(100)
+        self.diff_button.setToolTip("Click to compare the last run with the previous version's QC results.")
+        combined_layout.addWidget(self.diff_button, alignment=QtCore.Qt.AlignRight)
+
         self.run_button = QtWidgets.QPushButton('Run')
         self.run_button.setFixedWidth(100)
         self.run_button.setToolTip('Click to run all quality control checks.')
@@ -302,9 +313,7 @@ class QCChecksUI(QtWidgets.QWidget):
 
         # Get the description from 'descriptions.yml'
         description_lines = self.descriptions.get(department, {}).get(details_text, [])
-
-        if description_lines:
-            description = "<br>".join(description_lines)
+        description = "<br>".join(description_lines)
 
         formatted_text = f"""<p><b style="font-size:18px;">{details_text}</b></p>
                              <p><br></p>
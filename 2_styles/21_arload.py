@@ -11,9 +11,13 @@ import re
 import sys
 import shutil
 import getpass
+import sqlite3
 import datetime
+import threading
 import subprocess
 
+from collections import OrderedDict
+
 from Qt import QtWidgets, QtGui, QtCore, QtCompat
 
 import libLog
@@ -30,6 +34,298 @@ from arUtil import ArUtil
 TITLE = "load"
 LOG = libLog.init(script=TITLE)
 
+# Delay (ms) used to coalesce rapid selection changes before scanning
+NAV_DELAY = 150
+
+# Number of files kept in the preview metadata cache
+META_CACHE_SIZE = 2048
+THUMBNAIL_FORMATS = ['.jpg', '.png']
+
+# Local project index: scene root > set > asset > task > version
+INDEX_PATH = os.path.join(os.path.expanduser('~'), '.arload', 'index.db')
+INDEX_DEPTH = 4
+SEARCH_LIMIT = 200
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS folders (path TEXT PRIMARY KEY, mtime REAL);
+CREATE TABLE IF NOT EXISTS entries (path TEXT PRIMARY KEY, parent TEXT, name TEXT, is_dir INTEGER);
+CREATE INDEX IF NOT EXISTS entries_parent ON entries (parent);
+CREATE INDEX IF NOT EXISTS entries_name ON entries (name COLLATE NOCASE);
+"""
+
+
+# *********************************************************************************
+# LIST
+def natural_key(text):
+    """
+    Sort key splitting digits from text so 'v9' sorts before 'v10'.
+    """
+    return tuple(int(part) if part.isdigit() else part
+                 for part in re.split(r'(\d+)', text.lower()))
+
+
+class ArListItem(QtWidgets.QListWidgetItem):
+    """
+    List item carrying its natural sort key, computed once on creation.
+    """
+    def __init__(self, text):
+        super(ArListItem, self).__init__(text)
+        self.sort_key = natural_key(text)
+
+    def __lt__(self, other):
+        other_key = other.sort_key if hasattr(other, 'sort_key') else natural_key(other.text())
+        return self.sort_key < other_key
+
+
+class ArTypeFilter(QtCore.QObject):
+    """
+    Type-to-filter on a list widget: printable keys narrow the visible items,
+    Backspace removes a character and Escape clears the filter.
+    """
+    def __init__(self, list_widget):
+        super(ArTypeFilter, self).__init__(list_widget)
+        self.list_widget = list_widget
+        self.text = ''
+        list_widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() != QtCore.QEvent.KeyPress:
+            return False
+
+        if event.key() == QtCore.Qt.Key_Escape:
+            self.text = ''
+        elif event.key() == QtCore.Qt.Key_Backspace:
+            self.text = self.text[:-1]
+        elif event.text().strip() and event.text().isprintable():
+            self.text += event.text().lower()
+        else:
+            return False
+
+        self.apply()
+        return True
+
+    def apply(self):
+        # Hiding rows keeps the items (and their sort keys) alive. The current item stays visible,
+        # the lists after it show its content
+        current_item = self.list_widget.currentItem()
+        for index in range(self.list_widget.count()):
+            item = self.list_widget.item(index)
+            item.setHidden(item is not current_item and self.text not in item.text().lower())
+        self.list_widget.setToolTip('Filter: ' + self.text if self.text else '')
+
+
+class ArCloseFilter(QtCore.QObject):
+    """
+    Calls 'callback' with the close event when the watched widget is closed.
+    """
+    def __init__(self, widget, callback):
+        super(ArCloseFilter, self).__init__(widget)
+        self.callback = callback
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QtCore.QEvent.Close:
+            self.callback(event)
+        return False
+
+
+# *********************************************************************************
+# META
+def read_meta(file_path):
+    """
+    Stats one file and loads its thumbnail (same name, image extension) if any.
+    QImage is used instead of QPixmap so this can run outside the UI thread.
+    """
+    file_stat = os.stat(file_path)
+
+    try:
+        import pwd
+        owner = pwd.getpwuid(file_stat.st_uid).pw_name
+    except (ImportError, KeyError):
+        owner = ''
+
+    thumbnail = None
+    for image_format in THUMBNAIL_FORMATS:
+        image_path = os.path.splitext(file_path)[0] + image_format
+        if os.path.exists(image_path):
+            thumbnail = QtGui.QImage(image_path)
+            break
+
+    return {'size': file_stat.st_size,
+            'mtime': file_stat.st_mtime,
+            'owner': owner,
+            'thumbnail': thumbnail}
+
+
+def meta_key(file_path):
+    """
+    Cache key of a file: its path and modification time, so a re-saved file is read again.
+    """
+    return (file_path, os.stat(file_path).st_mtime)
+
+
+class ArMetaCache(object):
+    """
+    Thread safe LRU cache of file metadata, keyed by meta_key().
+    """
+    def __init__(self, max_size=META_CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            meta = self.entries.pop(key, None)
+            if meta is not None:
+                self.entries[key] = meta
+            return meta
+
+    def set(self, key, meta):
+        with self.lock:
+            self.entries.pop(key, None)
+            self.entries[key] = meta
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+
+class ArMetaWorker(QtCore.QThread):
+    """
+    Fills the cache for a whole file list in one background pass.
+    """
+    batchDone = QtCore.Signal()
+
+    def __init__(self, cache, file_paths):
+        super(ArMetaWorker, self).__init__()
+        self.cache = cache
+        self.file_paths = file_paths
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self):
+        for file_path in self.file_paths:
+            if self.stopped:
+                return
+            try:
+                key = meta_key(file_path)
+                if self.cache.get(key) is None:
+                    self.cache.set(key, read_meta(file_path))
+            except OSError:
+                continue
+        self.batchDone.emit()
+
+
+# *********************************************************************************
+# INDEX
+class ArIndex(object):
+    """
+    Persistent SQLite index of the project folders.
+    A folder is only listed again when its mtime changed since the last crawl.
+    """
+    def __init__(self, db_path=INDEX_PATH):
+        self.db_path = db_path
+        if not os.path.exists(os.path.dirname(db_path)):
+            os.makedirs(os.path.dirname(db_path))
+
+        self.connection = self.connect()
+        self.connection.executescript(INDEX_SCHEMA)
+
+    def connect(self):
+        # One connection per thread, WAL lets the UI read while the crawler writes
+        connection = sqlite3.connect(self.db_path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def children(self, path):
+        # None if the folder was never crawled, so the caller can fall back to disk
+        if not self.connection.execute('SELECT 1 FROM folders WHERE path = ?', (path,)).fetchone():
+            return None
+        rows = self.connection.execute('SELECT name FROM entries WHERE parent = ?', (path,))
+        return [row[0] for row in rows]
+
+    def search(self, text, limit=SEARCH_LIMIT):
+        # Substring match, prefix matches listed first
+        escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        rows = self.connection.execute("SELECT path FROM entries "
+                                       "WHERE name LIKE ? ESCAPE '\\' "
+                                       "ORDER BY name NOT LIKE ? ESCAPE '\\', name LIMIT ?",
+                                       ('%' + escaped + '%', escaped + '%', limit))
+        return [row[0] for row in rows]
+
+
+class ArIndexCrawler(QtCore.QThread):
+    """
+    Walks the scene roots in the background and updates the index incrementally.
+    """
+    crawlDone = QtCore.Signal()
+
+    def __init__(self, index, roots, max_depth=INDEX_DEPTH):
+        super(ArIndexCrawler, self).__init__()
+        self.index = index
+        self.roots = roots
+        self.max_depth = max_depth
+        self.stopped = False
+
+    def stop(self):
+        self.stopped = True
+
+    def run(self):
+        connection = self.index.connect()
+        for root in self.roots:
+            if self.stopped:
+                break
+            self.crawl(connection, root, 0)
+            connection.commit()
+        connection.close()
+        if not self.stopped:
+            self.crawlDone.emit()
+
+    def crawl(self, connection, path, depth):
+        if self.stopped:
+            return
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError:
+            return
+
+        row = connection.execute('SELECT mtime FROM folders WHERE path = ?', (path,)).fetchone()
+        old_dirs = set(row[0] for row in connection.execute(
+            'SELECT path FROM entries WHERE parent = ? AND is_dir = 1', (path,)))
+
+        if row and row[0] == mtime:
+            sub_dirs = old_dirs
+        else:
+            try:
+                names = os.listdir(path)
+            except OSError:
+                # Unreadable or removed since the stat: skip it, the next crawl retries
+                return
+
+            entries = []
+            for name in names:
+                if name.startswith('.'):
+                    continue
+                entry_path = path + '/' + name
+                entries.append((entry_path, path, name, int(os.path.isdir(entry_path))))
+
+            sub_dirs = set(entry[0] for entry in entries if entry[3])
+            for removed_dir in old_dirs - sub_dirs:
+                self.remove(connection, removed_dir)
+
+            connection.execute('DELETE FROM entries WHERE parent = ?', (path,))
+            connection.executemany('INSERT INTO entries VALUES (?, ?, ?, ?)', entries)
+            connection.execute('INSERT OR REPLACE INTO folders VALUES (?, ?)', (path, mtime))
+
+        if depth < self.max_depth:
+            for sub_dir in sub_dirs:
+                self.crawl(connection, sub_dir, depth + 1)
+
+    def remove(self, connection, path):
+        # '0' follows '/' in ASCII: the range covers exactly path/...
+        bounds = (path, path + '/', path + '0')
+        connection.execute('DELETE FROM folders WHERE path = ? OR (path > ? AND path < ?)', bounds)
+        connection.execute('DELETE FROM entries WHERE path = ? OR (path > ? AND path < ?)', bounds)
+
 
 # *********************************************************************************
 # CLASS
@@ -43,6 +339,12 @@ class ArLoad(ArUtil):
 
         self.load_dir = ''
         self.load_file = ''
+        self.scene_steps = 0
+        self.task_dir = ''
+
+        self.meta_cache = ArMetaCache()
+        self.meta_worker = None
+        self.meta_stopping = []
 
         self.software_format = {y:x.upper() for x,y in self.data['software']['EXTENSION'].items()}
         self.software_keys = list(self.software_format.keys())
@@ -51,6 +353,42 @@ class ArLoad(ArUtil):
         self.wgLoad.lstStatus.clear()
         self.wgLoad.lstSet.clear()
 
+        # Navigation: one timer, one connection per list (never reconnected)
+        self.nav_handlers = [self.change_lstScene, self.change_lstSet, self.change_lstAsset]
+        self.nav_pending = set()
+        self.nav_timer = QtCore.QTimer()
+        self.nav_timer.setSingleShot(True)
+        self.nav_timer.setInterval(NAV_DELAY)
+        self.nav_timer.timeout.connect(self.update_navigation)
+
+        self.wgLoad.lstScene.itemSelectionChanged.connect(lambda: self.queue_navigation(0))
+        self.wgLoad.lstSet.itemSelectionChanged.connect(lambda: self.queue_navigation(1))
+        self.wgLoad.lstAsset.itemSelectionChanged.connect(lambda: self.queue_navigation(2))
+
+        self.type_filters = {}
+        for list_widget in [self.wgLoad.lstScene, self.wgLoad.lstSet, self.wgLoad.lstAsset, self.wgLoad.lstTask]:
+            self.type_filters[list_widget] = ArTypeFilter(list_widget)
+
+        # Index: browse from the local database, refresh it in the background
+        self.index = ArIndex()
+        self.index_crawler = ArIndexCrawler(self.index, list(self.data['project']['PATH'].values()))
+        self.index_crawler.crawlDone.connect(self.refresh_lists)
+        self.index_crawler.start()
+
+        self.search_paths = QtCore.QStringListModel()
+        self.search_completer = QtWidgets.QCompleter(self.search_paths)
+        self.search_completer.setCompletionMode(QtWidgets.QCompleter.UnfilteredPopupCompletion)
+        self.search_completer.activated[str].connect(self.press_searchResult)
+
+        self.edtSearch = QtWidgets.QLineEdit()
+        self.edtSearch.setPlaceholderText('Search assets...')
+        self.edtSearch.setCompleter(self.search_completer)
+        self.edtSearch.textEdited.connect(self.change_edtSearch)
+        self.wgLoad.layout().addWidget(self.edtSearch)
+
+        # Qt aborts when a running QThread is destroyed: the threads are stopped on close
+        self.close_filter = ArCloseFilter(self.wgLoad, self.closeEvent)
+
         self.clear_meta()
         self.resize_widget(self.wgLoad)
         self.wgLoad.show()
@@ -58,6 +396,18 @@ class ArLoad(ArUtil):
         LOG.info('START : ArLoad')
 
 
+    def closeEvent(self, event=None):
+        # Stopping and waiting on the crawler and every metadata worker still running
+        self.index_crawler.stop()
+        self.index_crawler.wait()
+        for worker in [self.meta_worker] + self.meta_stopping:
+            if worker:
+                worker.stop()
+                worker.wait()
+        self.meta_worker = None
+        del self.meta_stopping[:]
+
+
     # *********************************************************************************
     # PRESS
     def press_btnAccept(self):
@@ -69,67 +419,201 @@ class ArLoad(ArUtil):
         import arSaveAs
         self.save_as = arSaveAs.start(new_file=False)
 
+    def press_searchResult(self, path):
+        # Select scene > set > asset > task matching the indexed path
+        for scene, scene_root in self.data['project']['PATH'].items():
+            if not path.startswith(scene_root + '/'):
+                continue
+
+            parts = path[len(scene_root) + 1:].split('/')
+            self.select_item(self.wgLoad.lstScene, scene)
+            self.change_lstScene()
+
+            list_widgets = [self.wgLoad.lstSet, self.wgLoad.lstTask]
+            if self.scene_steps >= 5:
+                list_widgets.insert(1, self.wgLoad.lstAsset)
+
+            for list_widget, part in zip(list_widgets, parts):
+                if not self.select_item(list_widget, part):
+                    break
+                if list_widget is self.wgLoad.lstSet:
+                    self.change_lstSet()
+                elif list_widget is self.wgLoad.lstAsset:
+                    self.change_lstAsset()
+            return
+
     def press_menuSort(self, list_widget, reverse=False):
-        file_list = []
-        for index in xrange(list_widget.count()):
-             file_list.append(list_widget.item(index).text())
+        # In place sort on the precomputed natural keys, no item is rebuilt
+        list_widget.sortItems(QtCore.Qt.DescendingOrder if reverse else QtCore.Qt.AscendingOrder)
+
+
+    # *********************************************************************************
+    # NAVIGATION
+    def queue_navigation(self, level):
+        # Restart the timer so only the last selection of a burst is scanned
+        self.nav_pending.add(level)
+        self.nav_timer.start()
+
+    def update_navigation(self):
+        # Upstream change rebuilds the downstream lists, so only run the highest one
+        if not self.nav_pending:
+            return
+        level = min(self.nav_pending)
+        self.nav_pending.clear()
+        self.nav_handlers[level]()
+
+    def select_item(self, list_widget, text):
+        items = list_widget.findItems(text, QtCore.Qt.MatchExactly)
+        if not items:
+            return False
+        list_widget.blockSignals(True)
+        list_widget.setCurrentItem(items[0])
+        list_widget.blockSignals(False)
+        return True
+
+    def refresh_lists(self):
+        # The crawl may have changed the indexed folders: rebuild the lists, keeping the selection
+        list_widgets = [self.wgLoad.lstSet, self.wgLoad.lstTask]
+        if self.scene_steps >= 5:
+            list_widgets.insert(1, self.wgLoad.lstAsset)
+        selection = [(list_widget, list_widget.currentItem().text())
+                     for list_widget in list_widgets if list_widget.currentItem()]
+        self.change_lstScene()
+
+        for list_widget, text in selection:
+            if not self.select_item(list_widget, text):
+                break
+            if list_widget is self.wgLoad.lstSet:
+                self.change_lstSet()
+            elif list_widget is self.wgLoad.lstAsset:
+                self.change_lstAsset()
+
+    def get_content(self, path):
+        content = self.index.children(path)
+        if content is None:
+            content = libFunc.get_file_list(path)
+        return content
 
+    def fill_list(self, list_widget, content):
+        # Programmatic refill: no selection signal, the caller cascades directly
+        list_widget.blockSignals(True)
         list_widget.clear()
-        list_widget.addItems(sorted(file_list, reverse=reverse))
+        if content:
+            for name in sorted(content, key=natural_key):
+                list_widget.addItem(ArListItem(name))
+            list_widget.setCurrentRow(0)
+        if list_widget in self.type_filters:
+            self.type_filters[list_widget].apply()
+        list_widget.blockSignals(False)
+        return bool(content)
 
 
     # *********************************************************************************
     # CHANGE
+    def change_edtSearch(self, text):
+        self.search_paths.setStringList(self.index.search(text) if text else [])
+
     def change_lstScene(self):
+        if not self.wgLoad.lstScene.currentItem():
+            return
+
         self.load_dir = self.data['project']['PATH'][self.wgLoad.lstScene.currentItem().text()]
-        tmp_content = libFunc.get_file_list(self.load_dir)
+        tmp_content = self.get_content(self.load_dir)
 
         self.scene_steps = len(self.data['rules']['SCENES'][self.wgLoad.lstScene.currentItem().text()].split('/'))
-        if self.scene_steps < 5:
-            self.wgLoad.lstAsset.hide()
-        else:
-            self.wgLoad.lstAsset.itemSelectionChanged.connect(self.change_lstAsset)
-            self.wgLoad.lstAsset.show()
+        self.wgLoad.lstAsset.setVisible(self.scene_steps >= 5)
 
-        self.wgLoad.lstSet.clear()
-        if tmp_content:
-            self.wgLoad.lstSet.addItems(sorted(tmp_content))
-            self.wgLoad.lstSet.setCurrentRow(0)
+        if self.fill_list(self.wgLoad.lstSet, tmp_content):
+            self.change_lstSet()
 
     def change_lstSet(self):
+        if not self.wgLoad.lstSet.currentItem():
+            return
+
         new_path = self.load_dir + '/' + self.wgLoad.lstSet.currentItem().text()
-        tmp_content = libFunc.get_file_list(new_path)
+        tmp_content = self.get_content(new_path)
 
         if self.scene_steps < 5:
-            self.wgLoad.lstTask.clear()
-            if tmp_content:
-                self.wgLoad.lstTask.addItems(sorted(tmp_content))
-                self.wgLoad.lstTask.setCurrentRow(0)
-        else:
-            self.wgLoad.lstAsset.clear()
-            if tmp_content:
-                self.wgLoad.lstAsset.addItems(sorted(tmp_content))
-                self.wgLoad.lstAsset.setCurrentRow(0)
+            self.fill_list(self.wgLoad.lstTask, tmp_content)
+            self.prefetch_meta(new_path, tmp_content)
+        elif self.fill_list(self.wgLoad.lstAsset, tmp_content):
+            self.change_lstAsset()
 
     def change_lstAsset(self):
+        if not self.wgLoad.lstSet.currentItem() or not self.wgLoad.lstAsset.currentItem():
+            return
+
         new_path = self.load_dir + '/' + self.wgLoad.lstSet.currentItem().text() \
                    + '/' + self.wgLoad.lstAsset.currentItem().text()
-        tmp_content = libFunc.get_file_list(new_path)
-        self.wgLoad.lstTask.clear()
-        if tmp_content:
-            self.wgLoad.lstTask.addItems(sorted(tmp_content))
-            self.wgLoad.lstTask.setCurrentRow(0)
+        tmp_content = self.get_content(new_path)
+        self.fill_list(self.wgLoad.lstTask, tmp_content)
+        self.prefetch_meta(new_path, tmp_content)
+
+
+    # *********************************************************************************
+    # META
+    def prefetch_meta(self, task_dir, file_list):
+        # Replace any running batch: only the visible task list matters
+        self.task_dir = task_dir
+        if self.meta_worker:
+            # Keep a reference until the thread exits, Qt aborts on running QThread deletion
+            # Connected before the running test: a worker finishing in between is still released
+            old_worker = self.meta_worker
+            old_worker.stop()
+            old_worker.batchDone.disconnect()
+            self.meta_stopping.append(old_worker)
+            old_worker.finished.connect(lambda: self.release_worker(old_worker))
+            if not old_worker.isRunning():
+                self.release_worker(old_worker)
+
+        if not file_list:
+            self.meta_worker = None
+            return
+
+        file_paths = [task_dir + '/' + file_name for file_name in file_list]
+        self.meta_worker = ArMetaWorker(self.meta_cache, file_paths)
+        self.meta_worker.batchDone.connect(self.refresh_meta)
+        self.meta_worker.start()
+
+    def release_worker(self, worker):
+        if worker in self.meta_stopping:
+            self.meta_stopping.remove(worker)
+
+    def refresh_meta(self):
+        if self.load_file and os.path.dirname(self.load_file) == self.task_dir:
+            self.fill_meta()
 
     def fill_meta(self):
+        key = meta_key(self.load_file)
+        meta = self.meta_cache.get(key)
+        if meta is None:
+            meta = read_meta(self.load_file)
+            self.meta_cache.set(key, meta)
+
         self.wgPreview.lblTitle.setText(self.file_name)
-        self.wgPreview.lblDate.setText(str(datetime.datetime.fromtimestamp(os.path.getmtime(self.load_file))).split(".")[0])
-        self.wgPreview.lblSize.setText(str("{0:.2f}".format(os.path.getsize(self.load_file)/(1024*1024.0)) + " MB"))
+        self.wgPreview.lblUser.setText(meta['owner'])
+        self.wgPreview.lblDate.setText(str(datetime.datetime.fromtimestamp(meta['mtime'])).split(".")[0])
+        self.wgPreview.lblSize.setText(str("{0:.2f}".format(meta['size']/(1024*1024.0)) + " MB"))
+
+        # Older preview layouts have no image label
+        if not hasattr(self.wgPreview, 'lblImage'):
+            return
+        if meta['thumbnail'] is not None:
+            self.wgPreview.lblImage.setPixmap(QtGui.QPixmap.fromImage(meta['thumbnail']))
+        else:
+            self.wgPreview.lblImage.clear()
 
     def clear_meta(self):
         self.wgPreview.lblUser.setText('')
         self.wgPreview.lblTitle.setText('')
         self.wgPreview.lblDate.setText('')
+        if hasattr(self.wgPreview, 'lblImage'):
+            self.wgPreview.lblImage.clear()
 
 def execute_the_class_ar_load():
     global main_widget
+    # The replaced window's threads have to stop before it is destroyed
+    if globals().get('main_widget'):
+        main_widget.closeEvent()
+        main_widget.wgLoad.close()
     main_widget = ArLoad()
@@ -5,6 +5,10 @@
 #************************************************************************************
 
 
+# Code object -> normalized filename, normcase is only paid once per function
+_normcase_cache = {}
+
+
 def find_caller(self):
     """
     Find the stack frame of the caller so that we can note the source
@@ -20,7 +24,10 @@ def find_caller(self):
 
     while hasattr(current_frame, "f_code"):
         current_frame_code = current_frame.f_code
-        filename = os.path.normcase(current_frame_code.co_filename)
+        filename = _normcase_cache.get(current_frame_code)
+        if filename is None:
+            filename = os.path.normcase(current_frame_code.co_filename)
+            _normcase_cache[current_frame_code] = filename
 
         if filename == _srcfile:
             current_frame = current_frame.f_back
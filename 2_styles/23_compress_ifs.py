@@ -17,14 +17,33 @@ def set_color(ctrlList=None, color=None):
                      7: 6,
                      8: 16}
 
-    for ctrlName in ctrlList:
-        try:
-            mc.setAttr(ctrlName + 'Shape.overrideEnabled', 1)
-
-            if color in color_mapping:
-                mc.setAttr(ctrlName + 'Shape.overrideColor', color_mapping[color])
-        except:
-            pass
+    # Missing controls would make the bulk query below raise, they are skipped instead
+    ctrlList = ctrlList or []
+    skipped = {ctrl: 'missing control' for ctrl in ctrlList if not mc.objExists(ctrl)}
+    ctrls = mc.ls([ctrl for ctrl in ctrlList if ctrl not in skipped], long=True) or []
+
+    # All curve shapes in one query, instead of guessing '<ctrl>Shape' per controller
+    shapes = (mc.listRelatives(ctrls, shapes=True, type='nurbsCurve', fullPath=True) or []) if ctrls else []
+    shaped = set(shape.rsplit('|', 1)[0] for shape in shapes)
+    skipped.update((ctrl, 'no nurbsCurve shape') for ctrl in ctrls if ctrl not in shaped)
+
+    mc.undoInfo(openChunk=True, chunkName='set_color')
+    try:
+        for shape in shapes:
+            try:
+                mc.setAttr(shape + '.overrideEnabled', 1)
+
+                if color in color_mapping:
+                    mc.setAttr(shape + '.overrideColor', color_mapping[color])
+            except RuntimeError as error:
+                # Locked or connected override attributes
+                skipped[shape] = str(error).strip()
+    finally:
+        mc.undoInfo(closeChunk=True)
+
+    # Skipped control or shape name as key, reason as value
+    # Rig wide rules: checks/rigging/rigging_control_color.py
+    return skipped
 
 
 # EXAMPLE
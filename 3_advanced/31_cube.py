@@ -29,6 +29,9 @@ CUBE CLASS
 """
 
 
+import numpy as np
+
+
 class Cube:
     def __init__(self, name):
         self.name = name
@@ -147,3 +150,249 @@ first_cube.update_transform("rotate", [35, 180, 95])
 first_cube.update_transform("scale", [5, 5, 5])
 first_cube.color(0.9, 1.0, 0.8)
 first_cube.print_status()
+
+
+
+# "TransformBatch": N objects stored in contiguous arrays, "CubeView" keeps the Cube API
+# -------------------------------------------------------------------------------
+
+
+class TransformBatch:
+    """
+    Translate, rotate, scale and color of N objects, one (N, 3) array per channel.
+    Nothing is printed unless verbose is True.
+    """
+    def __init__(self, names, verbose=False):
+        count = len(names)
+        self.names = list(names)
+        self.indices = {name: index for index, name in enumerate(self.names)}
+        self.verbose = verbose
+
+        self.translation = np.zeros((count, 3))
+        self.rotation = np.zeros((count, 3))
+        self.scale_factors = np.ones((count, 3))
+        self.color_rgb = np.ones((count, 3))
+
+        self.channels = {"translate": self.translation,
+                         "rotate":    self.rotation,
+                         "scale":     self.scale_factors,
+                         "color":     self.color_rgb
+                        }
+
+    def __len__(self):
+        return len(self.names)
+
+    def __getitem__(self, key):
+        index = self.indices[key] if isinstance(key, str) else key
+        return CubeView(self, index)
+
+    def update_transform(self, ttype, value, indices=None):
+        """
+        Sets one channel for a set of objects (all when indices is None).
+        value is one [x, y, z] for every object, or one row per index.
+        """
+        if indices is None:
+            indices = slice(None)
+        self.channels[ttype][indices] = value
+
+        if self.verbose:
+            print(f"{ttype} set on {len(self.names) if isinstance(indices, slice) else len(indices)} objects")
+
+    def print_status(self, indices=None):
+        for index in range(len(self)) if indices is None else indices:
+            self[index].print_status()
+
+
+class CubeView:
+    """
+    One row of a TransformBatch, with the same methods as Cube.
+    The channels are numpy views: reading or writing them reads or writes the batch.
+    """
+    def __init__(self, batch, index):
+        self.batch = batch
+        self.index = index
+        self.name = batch.names[index]
+
+    @property
+    def translation(self):
+        return self.batch.translation[self.index]
+
+    @property
+    def rotation(self):
+        return self.batch.rotation[self.index]
+
+    @property
+    def scale_factors(self):
+        return self.batch.scale_factors[self.index]
+
+    @property
+    def color_rgb(self):
+        return self.batch.color_rgb[self.index]
+
+    def translate(self, x, y, z):
+        self.update_transform("translate", [x, y, z])
+
+    def rotate(self, x, y, z):
+        self.update_transform("rotate", [x, y, z])
+
+    def scale(self, x, y, z):
+        self.update_transform("scale", [x, y, z])
+
+    def color(self, R, G, B):
+        self.update_transform("color", [R, G, B])
+
+    def update_transform(self, ttype, value):
+        self.batch.channels[ttype][self.index] = value
+        if self.batch.verbose:
+            print(f"{self.name} {ttype} set to: {list(value)}")
+
+    def print_status(self):
+        print(f"--- {self.name} Status ---")
+        print(f"Translation: {self.translation.tolist()}")
+        print(f"Rotation: {self.rotation.tolist()}")
+        print(f"Scale: {self.scale_factors.tolist()}")
+        print(f"Color: {self.color_rgb.tolist()}")
+        print("----------------------------")
+
+
+
+# TESTING
+cubes = TransformBatch([f"Cube{index:03}" for index in range(1, 1001)])
+cubes.update_transform("translate", [0, 5, 0])
+cubes.update_transform("scale", [2, 2, 2], indices=np.arange(0, 1000, 2))
+cubes.update_transform("rotate", np.random.uniform(0, 360, (10, 3)), indices=np.arange(10))
+cubes["Cube001"].color(0.9, 1.0, 0.8)
+cubes.print_status(indices=[0, 1])
+
+
+
+# "HierarchyBatch": parents, world matrices and dirty propagation on top of TransformBatch
+# -------------------------------------------------------------------------------
+
+
+def local_matrices(translation, rotation, scale_factors):
+    """
+    (N, 4, 4) local matrices, Maya convention: row vectors, rotate order xyz, M = S * R * T.
+    """
+    count = len(translation)
+    cos_x, cos_y, cos_z = np.cos(np.radians(rotation)).T
+    sin_x, sin_y, sin_z = np.sin(np.radians(rotation)).T
+
+    rot_x = np.zeros((count, 3, 3))
+    rot_x[:, 0, 0] = 1
+    rot_x[:, 1, 1], rot_x[:, 1, 2] = cos_x, sin_x
+    rot_x[:, 2, 1], rot_x[:, 2, 2] = -sin_x, cos_x
+
+    rot_y = np.zeros((count, 3, 3))
+    rot_y[:, 1, 1] = 1
+    rot_y[:, 0, 0], rot_y[:, 0, 2] = cos_y, -sin_y
+    rot_y[:, 2, 0], rot_y[:, 2, 2] = sin_y, cos_y
+
+    rot_z = np.zeros((count, 3, 3))
+    rot_z[:, 2, 2] = 1
+    rot_z[:, 0, 0], rot_z[:, 0, 1] = cos_z, sin_z
+    rot_z[:, 1, 0], rot_z[:, 1, 1] = -sin_z, cos_z
+
+    matrices = np.zeros((count, 4, 4))
+    matrices[:, :3, :3] = scale_factors[:, :, None] * (rot_x @ rot_y @ rot_z)
+    matrices[:, 3, :3] = translation
+    matrices[:, 3, 3] = 1
+    return matrices
+
+
+class HierarchyBatch(TransformBatch):
+    """
+    TransformBatch with parents. World matrices are evaluated one hierarchy level
+    at a time (one batched matmul per level), only for dirty objects and their descendants.
+    """
+    def __init__(self, names, parents, verbose=False):
+        super().__init__(names, verbose)
+        self.parents = np.array([-1 if parent is None else self.indices.get(parent, parent) for parent in parents])
+
+        # Depth of each object, then the objects of each depth
+        depth = np.zeros(len(self.names), dtype=int)
+        children = self.parents >= 0
+        for _ in range(len(self.names)):
+            new_depth = np.where(children, depth[self.parents] + 1, 0)
+            if np.array_equal(new_depth, depth):
+                break
+            depth = new_depth
+        else:
+            raise ValueError("Cycle in the hierarchy")
+        self.levels = [np.nonzero(depth == level)[0] for level in range(depth.max() + 1 if len(depth) else 0)]
+
+        self.world_matrices = np.tile(np.eye(4), (len(self.names), 1, 1))
+        self.dirty = np.ones(len(self.names), dtype=bool)
+
+    def update_transform(self, ttype, value, indices=None):
+        super().update_transform(ttype, value, indices)
+        if ttype != "color":
+            self.dirty[slice(None) if indices is None else indices] = True
+
+    def __getitem__(self, key):
+        index = self.indices[key] if isinstance(key, str) else key
+        return HierarchyView(self, index)
+
+    def evaluate(self):
+        """
+        Recomputes the world matrices of the dirty subtrees, returns how many were updated.
+        """
+        if not self.dirty.any():
+            return 0
+
+        updated = 0
+        for level, level_indices in enumerate(self.levels):
+            if level:
+                # Dirtiness goes down: a child is dirty when its parent is
+                self.dirty[level_indices] |= self.dirty[self.parents[level_indices]]
+            indices = level_indices[self.dirty[level_indices]]
+            if not len(indices):
+                continue
+
+            matrices = local_matrices(self.translation[indices], self.rotation[indices], self.scale_factors[indices])
+            if level:
+                matrices = matrices @ self.world_matrices[self.parents[indices]]
+            self.world_matrices[indices] = matrices
+            updated += len(indices)
+
+        self.dirty[:] = False
+        return updated
+
+    def world_positions(self):
+        self.evaluate()
+        return self.world_matrices[:, 3, :3].copy()
+
+    def world_bounds(self, bbox_min, bbox_max):
+        """
+        World axis aligned bounding boxes from local (N, 3) bounding boxes, all objects at once.
+        """
+        self.evaluate()
+        corners = np.stack([np.where(np.array(mask, dtype=bool), bbox_max, bbox_min)
+                            for mask in np.ndindex(2, 2, 2)], axis=1)
+        corners = np.concatenate([corners, np.ones(corners.shape[:2] + (1,))], axis=2)
+        world_corners = (corners @ self.world_matrices)[:, :, :3]
+        return world_corners.min(axis=1), world_corners.max(axis=1)
+
+
+class HierarchyView(CubeView):
+    """
+    CubeView marking its object dirty in the hierarchy when it changes.
+    """
+    def update_transform(self, ttype, value):
+        self.batch.update_transform(ttype, value, indices=[self.index])
+
+    @property
+    def world_matrix(self):
+        self.batch.evaluate()
+        return self.batch.world_matrices[self.index]
+
+
+
+# TESTING
+rig = HierarchyBatch(["root", "spine", "head", "prop"], [None, "root", "spine", None])
+rig["root"].translate(0, 10, 0)
+rig["spine"].rotate(0, 0, 90)
+rig["head"].translate(5, 0, 0)
+print(rig.world_positions())
+rig["head"].translate(6, 0, 0)
+print(f"Updated after one change: {rig.evaluate()}")
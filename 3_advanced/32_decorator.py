@@ -28,21 +28,24 @@ START - long_sleeping
 
 
 import time
+import functools
 
 # DECORATOR
+# Production version (aggregated histograms, free when disabled): 0_app/scripts/qc_profiler.py
 def print_process(func):
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
         print(f"START - {func.__name__}")
 
-        start_time = time.time()
+        start_time = time.perf_counter_ns()
         
         result = func(*args, **kwargs)
 
-        elapsed_time = time.time() - start_time
+        elapsed_time = (time.perf_counter_ns() - start_time) / 1e9
         
         hours, remainder = divmod(elapsed_time, 3600)
         minutes, seconds = divmod(remainder, 60)
-        time_str = f"{int(hours):02}:{int(minutes):02}:{int(seconds):02}"
+        time_str = f"{int(hours):02}:{int(minutes):02}:{seconds:06.3f}"
         
         print(f"END - {time_str}")
         return result